@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, '..'))
+
+IMPORT_PROBE = r"""
+import resource, sys, time
+started = time.perf_counter()
+sys.path.insert(0, ".")
+import main
+print(time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def status(url) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+def rss_mb(pid) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def measure_import(ml_dir):
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE], cwd=ml_dir, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    seconds, max_rss_kb = out.split()
+    return float(seconds), int(max_rss_kb) / 1024
+
+def measure_server(ml_dir, timeout=120.0):
+    port = free_port()
+    env = {k: v for k, v in os.environ.items() if k != "WEB_CONCURRENCY"}
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port)],
+        cwd=ml_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    healthy = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            elapsed = time.perf_counter() - started
+            if healthy is None and status(base + "/docs") == 200:
+                healthy = elapsed
+            # services without /readyz are ready as soon as they answer
+            if healthy is not None and status(base + "/readyz") in (200, 404):
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.02)
+        return healthy, ready, rss_mb(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def run(ml_dir, repeat):
+    results = {"import_s": [], "import_max_rss_mb": [], "serving_s": [], "ready_s": [], "rss_at_ready_mb": []}
+    for _ in range(repeat):
+        seconds, rss = measure_import(ml_dir)
+        results["import_s"].append(seconds)
+        results["import_max_rss_mb"].append(rss)
+        healthy, ready, rss = measure_server(ml_dir)
+        results["serving_s"].append(healthy)
+        results["ready_s"].append(ready)
+        results["rss_at_ready_mb"].append(rss)
+
+    summary = {key: round(min(v for v in values if v is not None), 3) for key, values in results.items()}
+    print(json.dumps({"ml_dir": ml_dir, **summary}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ML service import time, time to serve and time to ready")
+    parser.add_argument("--ml-dir", default=ML_DIR, help="service directory to measure, e.g. a worktree of an older commit")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(os.path.abspath(args.ml_dir), args.repeat)
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pydantic import ValidationError
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from benchmarks.payloads import SCHEMAS
+from training.columnar_validation import validate_frame
+
+def pydantic_validate(df, schema):
+    # the row-by-row path the trainers used before columnar validation
+    accepted, rows = [], []
+    for idx, row in df.iterrows():
+        try:
+            rows.append(schema(**row.to_dict()).model_dump())
+            accepted.append(idx)
+        except ValidationError:
+            pass
+    return pd.DataFrame(rows), accepted
+
+def corrupt(df, schema, fraction, seed=42):
+    # push a share of cells outside their bounds / off the integer grid
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    for name in schema.model_fields:
+        if name not in df.columns:
+            continue
+        mask = rng.random(len(df)) < fraction
+        df[name] = df[name].astype(np.float64)
+        df.loc[mask, name] = rng.choice([-1.5, 0.5, 7.0, 101.0, 1e7, np.inf], size=int(mask.sum()))
+    return df
+
+def run(dataset, csv_path, corrupt_fraction):
+    schema = SCHEMAS[dataset]
+    df = pd.read_csv(csv_path).fillna(0.0)
+    if corrupt_fraction:
+        df = corrupt(df, schema, corrupt_fraction)
+    print(f"{dataset}: {len(df):,} rows from {csv_path}")
+
+    t = time.perf_counter()
+    expected, accepted = pydantic_validate(df, schema)
+    pydantic_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    validated, violations, keep = validate_frame(df, schema)
+    columnar_s = time.perf_counter() - t
+
+    same_rows = list(np.flatnonzero(keep)) == list(df.index.get_indexer(accepted))
+    same_values = same_rows and np.allclose(
+        expected.to_numpy(dtype=np.float64, na_value=np.nan),
+        validated[list(expected.columns)].to_numpy(dtype=np.float64, na_value=np.nan),
+        equal_nan=True
+    ) if len(expected) else same_rows
+
+    print(f"  pydantic : {pydantic_s:8.3f}s  accepted {len(accepted):,}")
+    print(f"  columnar : {columnar_s:8.3f}s  accepted {int(keep.sum()):,}  ({pydantic_s / columnar_s:.0f}x faster)")
+    print(f"  identical accepted rows: {same_rows}, identical values: {same_values}")
+    for name, count in sorted(violations.items(), key=lambda kv: -kv[1])[:10]:
+        print(f"    {name:<36} {count:>8,}")
+    return same_rows and same_values
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare row-wise Pydantic validation with columnar validation")
+    parser.add_argument("dataset", choices=sorted(SCHEMAS))
+    parser.add_argument("csv_path")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="fraction of cells per column to corrupt")
+    args = parser.parse_args()
+    ok = run(args.dataset, args.csv_path, args.corrupt)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from benchmarks.payloads import SCHEMAS, sample_payload
+from inference.model_bundle import load_bundle
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+def latencies_us(fn, calls):
+    samples = np.empty(calls)
+    for i in range(calls):
+        started = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - started
+    return samples * 1e6
+
+def run(batch_sizes=(1, 16, 256), calls=2000):
+    print(f"{'Schema':<11} {'Batch':>6} {'Trees':>6} {'pipeline p50/p99 (us)':>23} {'compiled p50/p99 (us)':>23} {'Max |diff|':>11}")
+    print("-" * 86)
+    rng = np.random.default_rng(42)
+    for name, schema in SCHEMAS.items():
+        bundle = load_bundle(name, schema)
+        if bundle.compiled is None:
+            print(f"{name:<11} model is not a supported tree ensemble, skipped")
+            continue
+
+        row = bundle.vectorize([schema(**sample_payload(schema))])
+        for n in batch_sizes:
+            # jitter the sample row so the batch walks different paths through the trees
+            X = row * rng.uniform(0.5, 1.5, size=(n, row.shape[1]))
+            diff = np.abs(bundle.model.predict(X) - bundle.compiled.predict(X)).max()
+
+            n_calls = max(50, calls // n)
+            before = latencies_us(lambda: bundle.model.predict(X), n_calls)
+            after = latencies_us(lambda: bundle.compiled.predict(X), n_calls)
+            print(
+                f"{name:<11} {n:>6} {bundle.compiled.n_trees:>6} "
+                f"{np.percentile(before, 50):>11.1f} / {np.percentile(before, 99):<9.1f} "
+                f"{np.percentile(after, 50):>11.1f} / {np.percentile(after, 99):<9.1f} {diff:>11.2e}"
+            )
+
+if __name__ == "__main__":
+    run()
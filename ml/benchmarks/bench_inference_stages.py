@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import warnings
+import numpy as np
+from typing import List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+# every request repeats the same rows, so a warm result cache would skip the model entirely
+os.environ["RESULT_CACHE_MAX_MB"] = "0"
+
+from benchmarks.bench_compiled_ensemble import latencies_us
+from benchmarks.payloads import SCHEMAS, sample_payload
+from inference import predict_arrival, predict_eta, predict_occupancy
+from inference.model_bundle import ModelUnavailable, load_bundle, warm_up_models
+from schemas.json_io import FastJSONResponse, JSONBody
+import main
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+# validate parses the JSON too, as the endpoints do it in one validate_json pass
+STAGES = ("validate", "vectorize", "predict", "clip", "serialize")
+ENDPOINTS = {"eta": "/predict-eta", "arrival": "/predict-arrival", "occupancy": "/predict-occupancy"}
+
+def pipeline(name, bundle):
+    """predict and clip/response steps for one model, as the inference module and endpoint run them."""
+    if name == "eta":
+        return (
+            bundle.predict_with_quantiles,
+            lambda rows, outputs: [
+                main.eta_response(row, delay, quantiles)
+                for row, (delay, quantiles) in zip(rows, predict_eta._clip(bundle, *outputs))
+            ],
+        )
+    if name == "arrival":
+        return (
+            bundle.predict,
+            lambda rows, outputs: [
+                {"confirm_probability": prob, "confirm": prob >= 0.4} for prob in predict_arrival._clip(outputs)
+            ],
+        )
+    return (
+        bundle.predict,
+        lambda rows, outputs: [predict_occupancy._result(row, p) for p, row in zip(outputs.tolist(), rows)],
+    )
+
+def time_stages(name, schema, bundle, n, calls) -> dict:
+    """p50 microseconds per stage for a batch of n rows."""
+    body = json.dumps([sample_payload(schema)] * n).encode()
+    request_body = JSONBody(List[schema])
+    rows = request_body.validate(body)
+    X = bundle.vectorize(rows)
+    predict, clip = pipeline(name, bundle)
+    outputs = predict(X)
+    content = clip(rows, outputs)
+
+    stages = {
+        "validate": lambda: request_body.validate(body),
+        "vectorize": lambda: bundle.vectorize(rows),
+        "predict": lambda: predict(X),
+        "clip": lambda: clip(rows, outputs),
+        "serialize": lambda: FastJSONResponse(content).body,
+    }
+    n_calls = max(50, calls // n)
+    return {stage: float(np.percentile(latencies_us(fn, n_calls), 50)) for stage, fn in stages.items()}
+
+async def asgi_post(app, path, body):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    if status[0] != 200:
+        raise RuntimeError(f"{path} returned {status[0]}")
+
+async def time_requests(name, schema, n, calls) -> float:
+    """p50 microseconds for n concurrent single-row requests through the whole app."""
+    body = json.dumps(sample_payload(schema)).encode()
+    path = ENDPOINTS[name]
+    samples = np.empty(max(50, calls // n))
+    for i in range(len(samples)):
+        started = time.perf_counter()
+        await asyncio.gather(*(asgi_post(main.app, path, body) for _ in range(n)))
+        samples[i] = time.perf_counter() - started
+    return float(np.percentile(samples, 50) * 1e6)
+
+async def run(batch_sizes, calls, output=None):
+    results = []
+    async with main.app.router.lifespan_context(main.app):
+        await asyncio.to_thread(warm_up_models)
+        print("p50 microseconds per batch; 'request' is n concurrent single-row requests through the app")
+        print(f"{'Model':<10} {'Batch':>5} " + " ".join(f"{s:>9}" for s in STAGES) + f" {'stages':>9} {'request':>9}")
+        print("-" * 96)
+        for name, schema in SCHEMAS.items():
+            try:
+                bundle = load_bundle(name, schema)
+            except ModelUnavailable:
+                print(f"{name:<10} no trained model, skipped")
+                continue
+            for n in batch_sizes:
+                stages = time_stages(name, schema, bundle, n, calls)
+                request = await time_requests(name, schema, n, calls)
+                total = sum(stages.values())
+                print(f"{name:<10} {n:>5} " + " ".join(f"{stages[s]:>9.1f}" for s in STAGES) + f" {total:>9.1f} {request:>9.1f}")
+                results.append({"model": name, "batch": n, **{f"{s}_us": round(v, 2) for s, v in stages.items()}, "request_us": round(request, 2)})
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each inference stage of the predict endpoints in-process")
+    parser.add_argument("--batch-sizes", default="1,16,256")
+    parser.add_argument("--calls", type=int, default=2000, help="rows timed per stage and batch size")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    asyncio.run(run([int(n) for n in args.batch_sizes.split(",")], args.calls, args.output))
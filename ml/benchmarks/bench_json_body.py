@@ -0,0 +1,113 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from benchmarks.bench_compiled_ensemble import latencies_us
+from benchmarks.bench_inference_stages import asgi_post
+from benchmarks.payloads import SCHEMAS, sample_payload
+from inference.model_bundle import warm_up_models
+from schemas.eta_features import ETAFeatures
+from schemas.json_io import FastJSONResponse
+import main
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+# the endpoints as they were before, bytes -> dict -> model and dict -> jsonable_encoder -> json.dumps
+@main.app.post("/legacy/predict-eta")
+async def legacy_predict_eta(data: ETAFeatures):
+    delay_seconds, quantiles = await main.batchers["eta"].submit(data)
+    return main.eta_response(data, delay_seconds, quantiles)
+
+@main.app.post("/legacy/store-eta")
+def legacy_store_eta(data: dict):
+    try:
+        validated = ETAFeatures(**data)
+        pending = main.writers["eta"].submit(validated, data)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "queued", "pending": pending}
+
+def stage_table(payload, number):
+    body = json.dumps(payload).encode()
+    store_body = json.dumps({**payload, "delay_seconds": 42.0}).encode()
+    adapter = TypeAdapter(ETAFeatures)
+    row_schema = main.writers["eta"].row_schema
+    features = ETAFeatures.model_validate_json(body)
+    content = main.eta_response(features, 93.5, {"p10": 40.1, "p50": 90.2, "p90": 160.3})
+
+    def legacy_store():
+        data = json.loads(store_body)
+        row = ETAFeatures(**data).model_dump()
+        row["delay_seconds"] = data.get("delay_seconds")
+
+    pairs = [
+        ("validate /predict-eta body", lambda: adapter.validate_python(json.loads(body)), lambda: main.bodies["eta"].validate(body)),
+        ("serialize /predict-eta response", lambda: JSONResponse(jsonable_encoder(content)).body, lambda: FastJSONResponse(content).body),
+        ("validate + dump /store-eta row", legacy_store, lambda: row_schema.model_validate_json(store_body).model_dump()),
+    ]
+    print(f"ETA payload: {len(payload)} fields, {len(body)} bytes; p50 microseconds per call")
+    print(f"{'Stage':<34} {'dict path':>10} {'raw bytes':>10} {'saved':>8}")
+    print("-" * 66)
+    for label, before, after in pairs:
+        b = np.percentile(latencies_us(before, number), 50)
+        a = np.percentile(latencies_us(after, number), 50)
+        print(f"{label:<34} {b:>10.1f} {a:>10.1f} {1 - a / b:>7.0%}")
+
+async def cpu_per_request(path, body, n) -> float:
+    """Process CPU microseconds per request, sequential requests through the whole app."""
+    started = time.process_time()
+    for _ in range(n):
+        await asgi_post(main.app, path, body)
+    return (time.process_time() - started) / n * 1e6
+
+async def request_table(payload, n, rounds):
+    body = json.dumps(payload).encode()
+    store_body = json.dumps({**payload, "delay_seconds": 42.0}).encode()
+    endpoints = [
+        ("/predict-eta", "/legacy/predict-eta", "/predict-eta", body),
+        ("/store-eta", "/legacy/store-eta", "/store-eta", store_body),
+    ]
+    async with main.app.router.lifespan_context(main.app):
+        await asyncio.to_thread(warm_up_models)
+        for _, before, after, b in endpoints:
+            await cpu_per_request(before, b, 50)
+            await cpu_per_request(after, b, 50)
+        results = {}
+        for _ in range(rounds):
+            for label, before, after, b in endpoints:
+                results.setdefault((label, "before"), []).append(await cpu_per_request(before, b, n))
+                results.setdefault((label, "after"), []).append(await cpu_per_request(after, b, n))
+
+    print(f"\nCPU per request through the app, median of {rounds} x {n} requests (result cache off)")
+    print(f"{'Endpoint':<34} {'dict path':>10} {'raw bytes':>10} {'saved':>8}")
+    print("-" * 66)
+    for label, *_ in endpoints:
+        b = float(np.median(results[(label, "before")]))
+        a = float(np.median(results[(label, "after")]))
+        print(f"{label:<34} {b:>10.1f} {a:>10.1f} {1 - a / b:>7.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dict-based and raw-bytes request handling on the ETA payload")
+    parser.add_argument("--number", type=int, default=5000, help="calls per stage")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint and round")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = sample_payload(SCHEMAS["eta"])
+    stage_table(payload, args.number)
+    # /store-* rows are flushed relative to the working directory; keep them out of ml/data
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(request_table(payload, args.requests, args.rounds))
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from benchmarks.bench_inference_stages import asgi_post
+from benchmarks.payloads import SCHEMAS, sample_payload
+from inference import predict_arrival
+from inference.model_bundle import warm_up_models
+from monitoring import log as service_log
+import main
+
+structured_log_predictions = predict_arrival._log_predictions
+
+def print_predictions(features_list, probs):
+    # what predict_arrival did before: one synchronous stdout line per prediction
+    for prob in probs:
+        print("Probability:", prob)
+
+def configure(mode, sink, rate):
+    """Point arrival prediction logging at sink the way `mode` would."""
+    service_log.stop_logging()
+    predict_arrival._log_predictions = structured_log_predictions
+    sys.stdout = sink
+    service_log.sample_rates["predict-arrival"] = rate
+    root = logging.getLogger("ml")
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if mode == "print":
+        predict_arrival._log_predictions = print_predictions
+    elif mode == "sync":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(service_log.JsonFormatter())
+        root.addHandler(handler)
+    elif mode == "queue":
+        service_log.setup_logging(stream=sink)
+    elif mode == "off":
+        root.addHandler(logging.NullHandler())
+        service_log.sample_rates["predict-arrival"] = 0.0
+
+async def throughput(body, concurrency, duration) -> float:
+    """Requests per second with `concurrency` clients posting back to back."""
+    deadline = time.perf_counter() + duration
+    done = 0
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await asgi_post(main.app, "/predict-arrival", body)
+            done += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return done / (time.perf_counter() - started)
+
+class SlowSink:
+    """A file whose writes take at least `latency` seconds, like stdout piped to a busy log collector."""
+
+    def __init__(self, f, latency):
+        self.f = f
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.f.write(text)
+
+    def flush(self):
+        self.f.flush()
+
+async def run(concurrency, duration, rounds, latencies_ms, sink_path):
+    body = json.dumps(sample_payload(SCHEMAS["arrival"])).encode()
+    # line buffered, like the unbuffered stdout the service usually runs with
+    f = open(sink_path, "w", buffering=1)
+    stdout = sys.stdout
+    default_rate = service_log.sample_rates.get("predict-arrival", 1.0)
+    modes = [
+        ("print", "print() per prediction", 1.0),
+        ("sync", "JSON, synchronous handler", 1.0),
+        ("queue", "JSON, queue handler", 1.0),
+        ("queue", f"JSON, queue handler, sampled {default_rate:g}", default_rate),
+        ("off", "no prediction logging", 0.0),
+    ]
+    results = {}
+    try:
+        async with main.app.router.lifespan_context(main.app):
+            await asyncio.to_thread(warm_up_models)
+            await throughput(body, concurrency, 1.0)
+            for latency_ms in latencies_ms:
+                sink = SlowSink(f, latency_ms / 1000)
+                # rotate the order each round so drift over the run does not favour one mode
+                for r in range(rounds):
+                    for mode, label, rate in modes[r % len(modes):] + modes[:r % len(modes)]:
+                        configure(mode, sink, rate)
+                        rps = await throughput(body, concurrency, duration)
+                        service_log.stop_logging()
+                        results.setdefault((latency_ms, label), []).append(rps)
+    finally:
+        sys.stdout = stdout
+        f.close()
+
+    print(f"/predict-arrival, {concurrency} concurrent clients, median of {rounds} x {duration:g}s, log sink {sink_path}")
+    print(f"{'Sink write (ms)':>15} {'Logging':<40} {'req/s':>9} {'vs print':>9}")
+    print("-" * 76)
+    for latency_ms in latencies_ms:
+        baseline = float(np.median(results[(latency_ms, modes[0][1])]))
+        for _, label, _ in modes:
+            rps = float(np.median(results[(latency_ms, label)]))
+            print(f"{latency_ms:>15g} {label:<40} {rps:>9.1f} {rps / baseline:>8.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /predict-arrival throughput under each logging setup")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per mode and round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--sink-latency-ms", default="0,1", help="comma-separated extra time per log write")
+    parser.add_argument("--sink", default=os.path.join(tempfile.gettempdir(), "bench_logging.log"),
+                        help="file the logs are written to")
+    args = parser.parse_args()
+    latencies = [float(ms) for ms in args.sink_latency_ms.split(",")]
+    asyncio.run(run(args.concurrency, args.duration, args.rounds, latencies, args.sink))
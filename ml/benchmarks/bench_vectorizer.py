@@ -0,0 +1,52 @@
+import os
+import sys
+import timeit
+import warnings
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from benchmarks.payloads import SCHEMAS, sample_payload
+from inference.model_bundle import load_bundle
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+def dict_loop_vectorize(features_list, feature_order):
+    # the pre-vectorizer path: features.dict() + dict.get loop + np.array + np.nan_to_num
+    rows = []
+    for features in features_list:
+        feature_dict = features.dict()
+        feature_values = []
+        for f in feature_order:
+            value = feature_dict.get(f, 0)
+            if value is None:
+                value = 0
+            feature_values.append(value)
+        rows.append(feature_values)
+    X = np.array(rows, dtype=np.float64)
+    return np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+def per_row_us(fn, n_rows, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number / n_rows * 1e6
+
+def run(batch_sizes=(1, 16, 256)):
+    print(f"{'Schema':<11} {'Batch':>6} {'dict loop (us/row)':>20} {'vectorizer (us/row)':>21} {'Speedup':>8}")
+    print("-" * 70)
+    for name, schema in SCHEMAS.items():
+        bundle = load_bundle(name, schema)
+        features = schema(**sample_payload(schema))
+
+        for n in batch_sizes:
+            batch = [features] * n
+            expected = dict_loop_vectorize(batch, bundle.feature_order)
+            assert np.array_equal(expected, bundle.vectorize(batch)), f"{name}: vectorizer output differs"
+
+            number = max(1, 20000 // n)
+            before = per_row_us(lambda: dict_loop_vectorize(batch, bundle.feature_order), n, number)
+            after = per_row_us(lambda: bundle.vectorize(batch), n, number)
+            print(f"{name:<11} {n:>6} {before:>20.2f} {after:>21.2f} {before / after:>7.1f}x")
+
+if __name__ == "__main__":
+    run()
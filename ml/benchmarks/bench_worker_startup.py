@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ML_DIR = os.path.join(SCRIPT_DIR, '..')
+
+MODELS = ("eta", "arrival", "occupancy")
+
+# Runs inside each worker: load every model, score one row, report, then stay alive
+# until the parent has heard from all workers so their memory overlaps.
+WORKER = r"""
+import json, os, sys, time, warnings
+warnings.filterwarnings("ignore")
+started = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+mode, models = sys.argv[2], sys.argv[3].split(",")
+import numpy as np
+from benchmarks.payloads import SCHEMAS
+
+import joblib
+from inference.model_bundle import feature_order_path, model_path
+n_features = {name: len(joblib.load(feature_order_path(name))) for name in models}
+
+if mode == "pickle":
+    predict = {name: joblib.load(model_path(name)).predict for name in models}
+else:
+    from inference.model_bundle import load_bundle
+    predict = {name: load_bundle(name, SCHEMAS[name]).predict for name in models}
+
+for name in models:
+    predict[name](np.zeros((1, n_features[name])))
+elapsed = time.perf_counter() - started
+
+def kb(path, key):
+    with open(path) as f:
+        for line in f:
+            if line.startswith(key):
+                return int(line.split()[1])
+    return 0
+
+print(json.dumps({
+    "first_prediction_s": elapsed,
+    "rss_kb": kb("/proc/self/status", "VmRSS:"),
+    "pss_kb": kb("/proc/self/smaps_rollup", "Pss:"),
+}), flush=True)
+sys.stdin.read()
+"""
+
+def run_workers(mode, n_workers):
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER, ML_DIR, mode, ",".join(MODELS)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(n_workers)
+    ]
+    reports = []
+    for p in procs:
+        # skip the model loading log lines
+        line = p.stdout.readline()
+        while line and not line.startswith("{"):
+            line = p.stdout.readline()
+        reports.append(json.loads(line))
+    for p in procs:
+        p.communicate("")
+    return reports
+
+def run(n_workers=4):
+    # the first shared-mode load exports the arrays for models that were never published
+    run_workers("shared", 1)
+
+    print(f"{n_workers} workers, models: {', '.join(MODELS)}")
+    print(f"{'Mode':<8} {'first predict (s)':>18} {'RSS/worker (MB)':>16} {'PSS/worker (MB)':>16} {'PSS total (MB)':>15}")
+    print("-" * 78)
+    for mode in ("pickle", "shared"):
+        reports = run_workers(mode, n_workers)
+        first = sum(r["first_prediction_s"] for r in reports) / n_workers
+        rss = sum(r["rss_kb"] for r in reports) / n_workers / 1024
+        pss_total = sum(r["pss_kb"] for r in reports) / 1024
+        print(f"{mode:<8} {first:>18.2f} {rss:>16.1f} {pss_total / n_workers:>16.1f} {pss_total:>15.1f}")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
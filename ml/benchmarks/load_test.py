@@ -0,0 +1,350 @@
+import argparse
+import http.client
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from benchmarks.bench_cold_start import ML_DIR, free_port, status
+from storage.convert_csv import DATA_DIR, DATASETS
+
+# (fraction of the run, share of the peak rate) steps; rush-hour ramps up to the peak and back
+PROFILES = {
+    "constant": [(0.0, 1.0)],
+    "rush-hour": [(0.0, 0.2), (0.15, 0.5), (0.3, 1.0), (0.6, 0.5), (0.8, 0.2)],
+}
+
+ENDPOINTS = (
+    "predict-eta", "predict-eta/batch", "predict-trip-eta", "predict-arrival", "predict-occupancy",
+    "store-eta", "store-arrival", "store-occupancy",
+)
+
+# ETA columns that describe the route up to the target stop rather than the whole trip
+PER_STOP_COLUMNS = {
+    "target_stop_id", "stops_remaining", "remaining_segment_count", "total_segment_time_remaining",
+    "avg_segment_time_remaining", "segment_time_avg", "stddev_segment_time", "segment_time_variance",
+    "min_segment_time", "max_segment_time", "distance_remaining_km", "distance_to_target",
+    "scheduled_arrival_time", "seconds_until_scheduled", "base_travel_time", "inferred_passed_count",
+    "inferred_time_consumed",
+}
+TRIP_IDS = {"bus_id", "route_id", "trip_id", "prediction_made_at"}
+
+def load_rows(name, csv_path, n_rows) -> list:
+    """Rows of a generated dataset as request bodies: schema fields plus the target column."""
+    schema, target, default_csv, _ = DATASETS[name]
+    csv_path = csv_path or os.path.join(DATA_DIR, default_csv)
+    if not os.path.exists(csv_path):
+        raise SystemExit(f"{csv_path} not found, generate it first (see data/README.md) or pass --{name}-csv")
+    columns = set(schema.model_fields) | {target}
+    frame = pd.read_csv(csv_path, usecols=lambda c: c in columns, nrows=n_rows)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records"), target
+
+def trip_request(row) -> dict:
+    """A /predict-trip-eta body covering the stops up to the row's target, with even segments."""
+    n = max(1, int(row["stops_remaining"] or 1))
+    last = int(row["target_stop_id"])
+    segment = (row["total_segment_time_remaining"] or 0) / n
+    distance = (row["distance_remaining_km"] or 0) / n
+    return {
+        **{k: row[k] for k in TRIP_IDS if row.get(k) is not None},
+        "last_checkpoint_at": row["prediction_made_at"] - (row.get("minutes_since_last_checkpoint") or 0) * 60000,
+        "stop_ids": list(range(last - n + 1, last + 1)),
+        "segment_times": [segment] * n,
+        "segment_distances_km": [distance] * n,
+        "features": {
+            k: v for k, v in row.items()
+            if v is not None and k not in PER_STOP_COLUMNS and k not in TRIP_IDS and k != "delay_seconds"
+        },
+    }
+
+def build_bodies(args) -> dict:
+    """Encoded request bodies per endpoint, replayed round-robin."""
+    datasets = {
+        "eta": load_rows("eta", args.eta_csv, args.rows),
+        "arrival": load_rows("arrival", args.arrival_csv, args.rows),
+        "occupancy": load_rows("occupancy", args.occupancy_csv, args.rows),
+    }
+    bodies = {}
+    for name, (rows, target) in datasets.items():
+        features = [{k: v for k, v in row.items() if k != target} for row in rows]
+        bodies[f"predict-{name}"] = features
+        bodies[f"store-{name}"] = rows
+    eta = bodies["predict-eta"]
+    bodies["predict-eta/batch"] = [eta[i:i + args.batch_size] for i in range(0, len(eta), args.batch_size)]
+    bodies["predict-trip-eta"] = [trip_request(row) for row in datasets["eta"][0]]
+    return {
+        endpoint: [json.dumps(body).encode() for body in bodies[endpoint]]
+        for endpoint in args.endpoints
+    }
+
+class Client:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base_url, timeout):
+        url = urllib.parse.urlsplit(base_url)
+        self.host, self.port, self.prefix = url.hostname, url.port or 80, url.path.rstrip("/")
+        self.timeout = timeout
+        self.conn = None
+
+    def post(self, endpoint, body):
+        """Returns (HTTP status, ok); status 0 is a connection error or timeout."""
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request("POST", f"{self.prefix}/{endpoint}", body, {"Content-Type": "application/json"})
+            response = self.conn.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            return 0, False
+        # the store endpoints answer validation failures with 200 and a status field
+        return response.status, 200 <= response.status < 300 and b'"status":"error"' not in payload
+
+class Recorder:
+    def __init__(self):
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def add(self, endpoint, started, latency, code, ok):
+        with self._lock:
+            self.samples.append((endpoint, started, latency, code, ok))
+
+def arrival_times(rate, duration, profile, rng) -> np.ndarray:
+    """Poisson arrivals at rate * profile(t), drawn at the peak rate and thinned."""
+    n = rng.poisson(rate * duration * 1.2) + 16
+    times = np.cumsum(rng.exponential(1 / rate, n))
+    while times[-1] < duration:
+        times = np.concatenate([times, times[-1] + np.cumsum(rng.exponential(1 / rate, n))])
+    times = times[times < duration]
+    starts = np.array([start for start, _ in PROFILES[profile]]) * duration
+    shares = np.array([share for _, share in PROFILES[profile]])
+    keep = rng.random(len(times)) < shares[np.searchsorted(starts, times, side="right") - 1]
+    return times[keep]
+
+def run_closed(args, bodies, recorder):
+    """--concurrency workers each send their next request as soon as the previous one returns."""
+    endpoints = list(bodies)
+    deadline = time.perf_counter() + args.duration
+
+    def worker(i):
+        client = Client(args.url, args.timeout)
+        rng = np.random.default_rng([args.seed, i])
+        position = {e: int(rng.integers(len(bodies[e]))) for e in endpoints}
+        while time.perf_counter() < deadline:
+            endpoint = endpoints[rng.integers(len(endpoints))]
+            body = bodies[endpoint][position[endpoint] % len(bodies[endpoint])]
+            position[endpoint] += 1
+            started = time.perf_counter()
+            code, ok = client.post(endpoint, body)
+            recorder.add(endpoint, started, time.perf_counter() - started, code, ok)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def run_open(args, bodies, recorder):
+    """Requests are released on a Poisson schedule regardless of how fast earlier ones return.
+
+    Latency is measured from the scheduled send time, so time spent waiting for one of the
+    --concurrency connections counts against the service instead of being hidden.
+    """
+    rng = np.random.default_rng(args.seed)
+    endpoints = list(bodies)
+    schedule = arrival_times(args.rate, args.duration, args.profile, rng)
+    picks = rng.integers(len(endpoints), size=len(schedule))
+    pending = queue.Queue()
+
+    def worker():
+        client = Client(args.url, args.timeout)
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            due, endpoint, body = item
+            code, ok = client.post(endpoint, body)
+            recorder.add(endpoint, due, time.perf_counter() - due, code, ok)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    position = dict.fromkeys(endpoints, 0)
+    started = time.perf_counter()
+    for offset, pick in zip(schedule, picks):
+        endpoint = endpoints[pick]
+        body = bodies[endpoint][position[endpoint] % len(bodies[endpoint])]
+        position[endpoint] += 1
+        due = started + offset
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((due, endpoint, body))
+    for _ in threads:
+        pending.put(None)
+    for t in threads:
+        t.join()
+
+def summarize(samples, wall) -> dict:
+    latencies = np.array([s[2] for s in samples]) * 1000
+    codes = {}
+    for s in samples:
+        codes[str(s[3])] = codes.get(str(s[3]), 0) + 1
+    errors = sum(not s[4] for s in samples)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / wall, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "status_codes": codes,
+    }
+
+def report(args, recorder, wall) -> dict:
+    by_endpoint = {}
+    for sample in recorder.samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        "config": {
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "profile": args.profile if args.rate else None,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "batch_size": args.batch_size,
+            "rows": args.rows,
+        },
+        "overall": summarize(recorder.samples, wall),
+        "endpoints": {e: summarize(by_endpoint[e], wall) for e in args.endpoints if e in by_endpoint},
+    }
+
+def print_report(result):
+    config = result["config"]
+    load = f"{config['rate']} req/s peak, {config['profile']} profile" if config["mode"] == "open" else "closed loop"
+    print(f"{load}, {config['concurrency']} connections, {config['duration_s']}s")
+    print(f"{'Endpoint':<20} {'requests':>9} {'RPS':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    print("-" * 78)
+    for name, s in [*result["endpoints"].items(), ("overall", result["overall"])]:
+        print(f"{name:<20} {s['requests']:>9} {s['rps']:>8.1f} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+              f"{s['p99_ms']:>9.2f} {s['error_rate']:>8.2%}")
+
+def compare(result, baseline, tolerance, min_delta_ms, max_error_increase) -> list:
+    """Regressions against a saved run: latency or RPS beyond tolerance, or a higher error rate."""
+    if baseline["config"] != result["config"]:
+        print(f"warning: baseline config {baseline['config']} differs from this run")
+    regressions = []
+    for name, base in [*baseline["endpoints"].items(), ("overall", baseline["overall"])]:
+        current = result["overall"] if name == "overall" else result["endpoints"].get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from this run")
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > base[key] * (1 + tolerance) and current[key] - base[key] > min_delta_ms:
+                regressions.append(f"{name}: {key} {base[key]} -> {current[key]}")
+        # an open-loop run's throughput is set by the schedule, so only closed loops compare RPS
+        if result["config"]["mode"] == "closed" and current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']} -> {current['rps']}")
+        if current["error_rate"] > base["error_rate"] + max_error_increase:
+            regressions.append(f"{name}: error_rate {base['error_rate']} -> {current['error_rate']}")
+    return regressions
+
+def start_server(ml_dir, workdir, timeout=120.0):
+    """uvicorn on a free port, run from workdir so /store-* rows land there instead of ml/data."""
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", ml_dir, "--port", str(port), "--no-access-log"],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode}")
+        if status(base + "/readyz") == 200:
+            return proc, base
+        time.sleep(0.1)
+    proc.terminate()
+    raise SystemExit(f"server not ready after {timeout}s, are the models trained?")
+
+def run(args):
+    bodies = build_bodies(args)
+    # one request per endpoint first, so lazy loads and compilation stay out of the numbers
+    client = Client(args.url, args.timeout)
+    for endpoint in args.endpoints:
+        client.post(endpoint, bodies[endpoint][0])
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    (run_open if args.rate else run_closed)(args, bodies, recorder)
+    return report(args, recorder, time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay generated datasets against the ML service and report latency")
+    parser.add_argument("--url", help="running service to test; by default a local server is started")
+    parser.add_argument("--ml-dir", default=ML_DIR, help="service directory to start when --url is not given")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated subset of: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--eta-csv")
+    parser.add_argument("--arrival-csv")
+    parser.add_argument("--occupancy-csv")
+    parser.add_argument("--rows", type=int, default=5000, help="rows replayed from each dataset")
+    parser.add_argument("--batch-size", type=int, default=16, help="rows per /predict-eta/batch request")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections, i.e. the most requests in flight")
+    parser.add_argument("--rate", type=float, help="open-loop peak arrival rate (req/s); closed loop when omitted")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="constant")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", help="write the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare with; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative latency/RPS change")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="latency changes below this never count")
+    parser.add_argument("--max-error-increase", type=float, default=0.01)
+    args = parser.parse_args()
+
+    args.endpoints = [e.strip().strip("/") for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    proc = None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.url is None:
+                proc, args.url = start_server(os.path.abspath(args.ml_dir), workdir)
+            result = run(args)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    print_report(result)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.min_delta_ms, args.max_error_increase)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from schemas.arrival_features import ArrivalFeatures
+from schemas.eta_features import ETAFeatures
+from schemas.occupancy_features import OccupancyFeatures
+
+SCHEMAS = {
+    "eta": ETAFeatures,
+    "arrival": ArrivalFeatures,
+    "occupancy": OccupancyFeatures,
+}
+
+def _lower_bound(field):
+    for meta in field.metadata:
+        ge = getattr(meta, "ge", None)
+        if ge is not None:
+            return ge
+    return 0
+
+def sample_payload(schema) -> dict:
+    """A valid request body built from the schema example, defaults and bounds."""
+    example = (schema.model_config.get("json_schema_extra") or {}).get("example", {})
+    payload = {}
+    for name, field in schema.model_fields.items():
+        if name in example:
+            payload[name] = example[name]
+        elif not field.is_required() and field.default is not None:
+            payload[name] = field.default
+        else:
+            payload[name] = _lower_bound(field)
+    return payload
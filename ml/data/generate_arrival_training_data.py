@@ -19,10 +19,15 @@ Realism design:
   • All bus_id, stop_id, route_id values mirror seed.js exactly.
   • Sri-Lankan climate (monsoon, no snow, tropical temps).
 
-Output: data/arrivals/arrivals.csv  (~120 k rows by default)
+Rows are produced and written in fixed-size chunks, so memory stays flat
+however many rows are requested.
+
+Output: data/arrivals/arrivals.csv  (75 k rows by default)
+        data/arrivals/dataset      with --format parquet, where the trainer reads it
+Usage : python generate_arrival_training_data.py --rows 5000000 --format parquet
 """
 
-import os, sys, math, random
+import os, sys, math, random, time, argparse, itertools, resource
 import numpy as np
 import pandas as pd
 from datetime import datetime, timezone, timedelta
@@ -35,9 +40,12 @@ np.random.seed(SEED)
 
 # ── output ─────────────────────────────────────────────────────────────────────
 SCRIPT_DIR  = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
 OUTPUT_DIR  = os.path.join(SCRIPT_DIR, "arrivals")
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "arrivals.csv")
+DATASET_DIR = os.path.join(OUTPUT_DIR, "dataset")   # training/train_arrival.py DATASET_PATH
 NUM_ROWS    = 75_000
+CHUNK_ROWS  = 50_000
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  STATIC REFERENCE  (mirrors seed.js exactly)
@@ -424,17 +432,24 @@ def generate_row(bus, stop, month, day_of_month, dow_js, hour, wc, base_ms, prev
 WEEKDAY_HOURS = list(range(5, 23))           # every hour 05:00–22:00
 WEEKEND_HOURS = [6,8,10,12,14,16,18,20]      # sparser service
 
-def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE):
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+INT_COLS = [
+    "bus_id","stop_id","route_id","trip_id",
+    "report_count","unique_reporters",
+    "hour_of_day","day_of_week",
+    "is_weekend","is_rush_hour","is_early_morning","is_mid_day",
+    "is_evening","is_night",
+    "weather_clear","weather_rain","weather_snow","weather_fog",
+    "weather_clouds","weather_thunderstorm","weather_unknown",
+    "traffic_level","event_nearby",
+]
 
+def iter_rows():
+    """Endless stream of rows, day by day, in the same order and with the same draws as before."""
     BASE_DATE = datetime(2024, 7, 1, tzinfo=timezone.utc)
-    all_rows  = []
     day       = 0
     prev_arr  = {}   # (bus_id, stop_id) → last arrival_ms
 
-    print(f"Generating ≈{n_rows:,} rows …")
-
-    while len(all_rows) < n_rows:
+    while True:
         date       = BASE_DATE + timedelta(days=day % 365)
         month      = date.month - 1
         dom        = date.day
@@ -454,62 +469,143 @@ def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE):
                     row            = generate_row(bus, stop, month, dom, dow_js,
                                                   hour, wc, base_ms, prev_arr_ms)
                     prev_arr[key]  = row["arrival_time"]
-                    all_rows.append(row)
+                    yield row
 
         day += 1
-        if day % 10 == 0:
-            pct = min(100, len(all_rows) * 100 // n_rows)
-            print(f"  day {day:3d} | rows {len(all_rows):8,} ({pct}%)")
-
-    all_rows = all_rows[:n_rows]
-    df = pd.DataFrame(all_rows)
-
-    # ── dtype cleanup ─────────────────────────────────────────────────────
-    int_cols = [
-        "bus_id","stop_id","route_id","trip_id",
-        "report_count","unique_reporters",
-        "hour_of_day","day_of_week",
-        "is_weekend","is_rush_hour","is_early_morning","is_mid_day",
-        "is_evening","is_night",
-        "weather_clear","weather_rain","weather_snow","weather_fog",
-        "weather_clouds","weather_thunderstorm","weather_unknown",
-        "traffic_level","event_nearby",
-    ]
-    for c in int_cols:
+
+# mixes 0.0 with integral timestamps, so its dtype would otherwise depend on the chunk
+FLOAT_COLS = ["prev_arrival_time"]
+
+def to_frame(rows):
+    df = pd.DataFrame(rows)
+    for c in INT_COLS:
         if c in df.columns:
             df[c] = df[c].fillna(0).astype(int)
+    for c in FLOAT_COLS:
+        df[c] = df[c].astype(float)
+    return df
 
-    df.to_csv(output_path, index=False)
-
-    # ── summary ───────────────────────────────────────────────────────────
-    print(f"\n✓ Saved {len(df):,} rows → {output_path}")
-    print(f"\nFeature summary:")
-    print(f"  Columns  : {len(df.columns)}")
-    print(f"  Routes   : {df['route_id'].nunique()}  Buses: {df['bus_id'].nunique()}  "
-          f"Stops: {df['stop_id'].nunique()}")
-
-    print(f"\nTarget — confirm_prob:")
-    print(df["confirm_prob"].describe().round(3).to_string())
-
-    print(f"\nDistribution buckets:")
-    bins  = [0, 0.2, 0.4, 0.6, 0.8, 1.01]
-    labels= ["0.0–0.2","0.2–0.4","0.4–0.6","0.6–0.8","0.8–1.0"]
-    df["_bucket"] = pd.cut(df["confirm_prob"], bins=bins, labels=labels, right=False)
-    for label, cnt in df["_bucket"].value_counts().sort_index().items():
-        bar = "█" * int(cnt / len(df) * 40)
-        print(f"  {label}  {cnt:>7,} ({cnt/len(df)*100:4.1f}%)  {bar}")
-    df.drop(columns=["_bucket"], inplace=True)
-
-    print(f"\nMean confirm_prob by scenario:")
-    print(f"  Rush hour  : {df[df.is_rush_hour==1]['confirm_prob'].mean():.3f}")
-    print(f"  Off-peak   : {df[df.is_rush_hour==0]['confirm_prob'].mean():.3f}")
-    print(f"  Night      : {df[df.is_night==1]['confirm_prob'].mean():.3f}")
-    print(f"  Event nearby: {df[df.event_nearby==1]['confirm_prob'].mean():.3f}")
-    print(f"  High traffic: {df[df.traffic_level==3]['confirm_prob'].mean():.3f}")
-    print(f"  Rain        : {df[df.weather_rain==1]['confirm_prob'].mean():.3f}")
+class CsvSink:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode="a", header=self.header, index=False)
+        self.header = False
+
+class ParquetSink:
+    """Appends each chunk to a month/route_id partitioned dataset the trainers read directly."""
+
+    def __init__(self, path):
+        from schemas.arrival_features import ArrivalFeatures
+        from storage.parquet_dataset import arrow_schema
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.schema = arrow_schema(ArrivalFeatures, "confirm_prob")
+
+    def write(self, df):
+        import pyarrow as pa
+        from storage.parquet_dataset import write_partitioned
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        months = df["arrival_time"].to_numpy().astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+        write_partitioned(table.append_column("month", pa.array(months, type=pa.string())), self.path)
+
+class RunningSummary:
+    """Target statistics accumulated chunk by chunk, so the summary never needs all rows."""
+
+    BINS   = [0, 0.2, 0.4, 0.6, 0.8, 1.01]
+    LABELS = ["0.0–0.2","0.2–0.4","0.4–0.6","0.6–0.8","0.8–1.0"]
+    SCENARIOS = [
+        ("Rush hour  ", lambda df: df.is_rush_hour==1),
+        ("Off-peak   ", lambda df: df.is_rush_hour==0),
+        ("Night      ", lambda df: df.is_night==1),
+        ("Event nearby", lambda df: df.event_nearby==1),
+        ("High traffic", lambda df: df.traffic_level==3),
+        ("Rain        ", lambda df: df.weather_rain==1),
+    ]
 
-    return df
+    def __init__(self):
+        self.n = 0; self.total = 0.0; self.total_sq = 0.0
+        self.lo = math.inf; self.hi = -math.inf
+        self.buckets = np.zeros(len(self.LABELS), dtype=np.int64)
+        self.scenarios = {label: [0.0, 0] for label, _ in self.SCENARIOS}
+        self.routes, self.buses, self.stops = set(), set(), set()
+        self.columns = 0
+
+    def add(self, df):
+        p = df["confirm_prob"].to_numpy()
+        self.n += len(p); self.total += p.sum(); self.total_sq += (p ** 2).sum()
+        self.lo = min(self.lo, p.min()); self.hi = max(self.hi, p.max())
+        self.buckets += np.histogram(p, bins=self.BINS)[0]
+        for label, mask in self.SCENARIOS:
+            sub = p[mask(df).to_numpy()]
+            self.scenarios[label][0] += sub.sum(); self.scenarios[label][1] += len(sub)
+        self.routes.update(df["route_id"].unique()); self.buses.update(df["bus_id"].unique())
+        self.stops.update(df["stop_id"].unique())
+        self.columns = len(df.columns)
+
+    def print(self):
+        mean = self.total / self.n
+        std  = math.sqrt(max(0.0, self.total_sq / self.n - mean ** 2))
+        print(f"\nFeature summary:")
+        print(f"  Columns  : {self.columns}")
+        print(f"  Routes   : {len(self.routes)}  Buses: {len(self.buses)}  Stops: {len(self.stops)}")
+
+        print(f"\nTarget — confirm_prob:")
+        print(f"  count {self.n:,}  mean {mean:.3f}  std {std:.3f}  min {self.lo:.3f}  max {self.hi:.3f}")
+
+        print(f"\nDistribution buckets:")
+        for label, cnt in zip(self.LABELS, self.buckets):
+            bar = "█" * int(cnt / self.n * 40)
+            print(f"  {label}  {cnt:>7,} ({cnt/self.n*100:4.1f}%)  {bar}")
+
+        print(f"\nMean confirm_prob by scenario:")
+        for label, (total, count) in self.scenarios.items():
+            print(f"  {label}: {total / count if count else float('nan'):.3f}")
+
+def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE, fmt="csv", chunk_rows=CHUNK_ROWS):
+    """Write n_rows to output_path and return the number of rows written.
+
+    This used to return the whole DataFrame; rows are now streamed to disk chunk by
+    chunk and never held in memory together, so read the output back if you need them.
+    """
+    sink    = CsvSink(output_path) if fmt == "csv" else ParquetSink(output_path)
+    summary = RunningSummary()
+    rows    = itertools.islice(iter_rows(), n_rows)
+    written = 0
+    started = time.perf_counter()
+
+    print(f"Generating {n_rows:,} rows in chunks of {chunk_rows:,} …")
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            break
+        df = to_frame(chunk)
+        sink.write(df)
+        summary.add(df)
+        written += len(df)
+
+        elapsed = time.perf_counter() - started
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"  rows {written:>12,} ({written * 100 // n_rows:3d}%) | "
+              f"{written / elapsed:>9,.0f} rows/s | peak RSS {peak_mb:,.0f} MB")
+
+    print(f"\n✓ Saved {written:,} rows → {output_path}  ({time.perf_counter() - started:.1f}s)")
+    summary.print()
+    return written
 
 
 if __name__ == "__main__":
-    df = generate()
+    parser = argparse.ArgumentParser(description="Generate synthetic arrival-confirmation training data")
+    parser.add_argument("--rows", type=int, default=NUM_ROWS)
+    parser.add_argument("--out", help="CSV file, or dataset directory for --format parquet")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    out = args.out or (OUTPUT_FILE if args.format == "csv" else DATASET_DIR)
+    generate(args.rows, out, fmt=args.format, chunk_rows=args.chunk_rows)
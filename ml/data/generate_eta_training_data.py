@@ -11,23 +11,35 @@ Target column : delay_seconds
 All 75+ feature columns have genuine causal relationships with the target
 so the model has real signal to learn — not random noise dressed as features.
 
-Output : data/eta/eta.csv   (~150 k rows by default)
-Needs  : pip install numpy pandas scipy
+Trips are simulated a whole shard of days at a time with array operations.
+Shards run on a process pool, each with its own generator seeded from
+(--seed, shard index), so the output does not depend on the worker count.
+Rows are written shard by shard, to one CSV or to a Parquet dataset
+partitioned like the one the service collects.
+
+Output : data/eta/eta.csv   (75 k rows by default)
+Usage  : python generate_eta_training_data.py --rows 20000000 --format parquet  (→ data/eta/dataset)
+Needs  : pip install numpy pandas pyarrow
 """
 
-import os, sys, math, random
+import os, sys, math, random, time, argparse
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone, timedelta
+import multiprocessing
 
 SEED = 42
 random.seed(SEED)
 np.random.seed(SEED)
 
 SCRIPT_DIR  = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
 OUTPUT_DIR  = os.path.join(SCRIPT_DIR, "eta")
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, "eta.csv")
+DATASET_DIR = os.path.join(OUTPUT_DIR, "dataset")   # training/train_eta.py DATASET_PATH
 NUM_ROWS    = 75_000
+DAYS_PER_SHARD = 28
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  STATIC REFERENCE DATA
@@ -114,51 +126,6 @@ def haversine(lat1, lon1, lat2, lon2):
 
 def clamp(v,lo,hi): return max(lo,min(hi,v))
 
-def rush_mult(hour, minute=0):
-    t = hour + minute/60
-    if 7.0<=t<=9.5:   return random.uniform(1.8,3.5)
-    if 11.5<=t<=13.0: return random.uniform(1.1,1.4)
-    if 16.0<=t<=19.5: return random.uniform(1.5,3.0)
-    if t<6.5:         return random.uniform(0.5,0.85)
-    return 1.0
-
-def draw_weather(month):
-    rp=MONTHLY_RAIN_PROB[month]; r=random.random()
-    if r<rp*0.10: return "thunderstorm"
-    if r<rp*0.25: return "heavy_rain"
-    if r<rp:      return "rain"
-    if r<rp+0.08: return "fog"
-    if r<rp+0.22: return "cloudy"
-    return "clear"
-
-def weather_numerics(wc):
-    rain = max(0,{"thunderstorm":12.0,"heavy_rain":8.0,"rain":3.5}.get(wc,0)+random.uniform(-.3,.3))
-    vis  = max(0,{"thunderstorm":2000,"heavy_rain":3500,"rain":6000,"fog":1500,"cloudy":8000,"clear":10000}[wc]+random.uniform(-200,200))
-    wind = max(0,{"thunderstorm":random.uniform(8,18),"heavy_rain":random.uniform(4,10),"rain":random.uniform(2,7),"fog":random.uniform(0,3),"cloudy":random.uniform(1,5),"clear":random.uniform(0,4)}[wc])
-    hum  = clamp({"thunderstorm":random.uniform(88,100),"heavy_rain":random.uniform(82,97),"rain":random.uniform(75,92),"fog":random.uniform(80,95),"cloudy":random.uniform(60,80),"clear":random.uniform(45,70)}[wc],0,100)
-    temp = random.uniform(20,27) if wc in("thunderstorm","heavy_rain") else random.uniform(24,32)
-    mult = {"thunderstorm":2.2,"heavy_rain":1.7,"rain":1.3,"fog":1.25,"cloudy":1.05,"clear":1.0}[wc]
-    return rain,vis,wind,hum,temp,mult
-
-def weather_onehot(wc):
-    oh={f"weather_{c}":0 for c in ["clear","rain","snow","fog","clouds","thunderstorm","unknown"]}
-    if wc in("rain","heavy_rain"): oh["weather_rain"]=1
-    elif wc=="thunderstorm":       oh["weather_thunderstorm"]=1
-    elif wc=="fog":                oh["weather_fog"]=1
-    elif wc=="cloudy":             oh["weather_clouds"]=1
-    else:                          oh["weather_clear"]=1
-    return oh
-
-def weather_delay_sec(wc, road):
-    base={"thunderstorm":{"city":240,"main":160,"mountain":360,"highway":100},
-          "heavy_rain":  {"city":180,"main":110,"mountain":260,"highway":70},
-          "rain":        {"city":60,"main":45,"mountain":120,"highway":30},
-          "fog":         {"city":45,"main":35,"mountain":90,"highway":25},
-          "cloudy":      {"city":10,"main":8,"mountain":15,"highway":5},
-          "clear":       {"city":0,"main":0,"mountain":0,"highway":0}}
-    mean=base.get(wc,base["clear"]).get(road,0)
-    return max(0, np.random.normal(mean,mean*0.3))
-
 # ── precompute segment baselines ──────────────────────────────────────────────
 seg_baselines = {}
 for route_id, route_stops in STOPS_BY_ROUTE.items():
@@ -183,270 +150,391 @@ for route_id in range(1,6):
         hist_stats[(route_id,hour)]=(base,p50,p90,punc)
 
 # ══════════════════════════════════════════════════════════════════════════════
-#  TRIP SIMULATOR
+#  LOOKUP TABLES  (route × stop / segment arrays padded to the longest route)
 # ══════════════════════════════════════════════════════════════════════════════
 
-def simulate_trip(bus, date, start_hour, base_ts_ms):
-    route_id    = bus["route"]
-    route_stops = STOPS_BY_ROUTE[route_id]
-    n_stops     = len(route_stops)
-    month       = date.month-1
-    dom         = date.day
-    dow_py      = date.weekday()
-    dow_js      = (dow_py+1)%7
-    is_weekend  = int(dow_py>=5)
-    is_holiday  = int((month,dom) in SL_HOLIDAYS)
-
-    wc = draw_weather(month)
-    rain_mm,vis_m,wind,humid,temp,wmult = weather_numerics(wc)
-    oh = weather_onehot(wc)
-    tl_base = 3 if ((7<=start_hour<=9 or 17<=start_hour<=19) and wc in("thunderstorm","heavy_rain")) \
-              else 2 if (7<=start_hour<=9 or 17<=start_hour<=19) else 1
-
-    # ── propagate delay through all stops ─────────────────────────────────
-    running_delay = np.random.normal(0,40)
-    stop_delays   = []
-    for si,stop in enumerate(route_stops):
-        road=stop["road"]
-        rm=rush_mult(start_hour+si*0.3)
-        if si>0:
-            seg_avg,seg_std,_=seg_baselines.get((route_id,route_stops[si-1]["seq"]),(600,90,10))
-            running_delay += np.random.normal(0,seg_std*0.25)*rm + weather_delay_sec(wc,road)
-        else:
-            running_delay=clamp(running_delay,-90,180)
-        if random.random()<0.004: running_delay+=random.randint(300,1200)
-        ev=EVENT_MAP.get((month,dom,stop["name"]),0)
-        if ev: running_delay+=ev*random.uniform(0.6,1.4)
-        if si>0 and running_delay>0: running_delay*=random.uniform(0.86,0.95)
-        elif si>0: running_delay=max(-120,running_delay)
-        stop_delays.append(round(running_delay))
-
-    rows=[]
-    hist_avg,hist_p50,hist_p90,hist_punc=hist_stats[(route_id,start_hour%24)]
-
-    for current_si in range(n_stops-1):
-        current_stop   = route_stops[current_si]
-        current_delay  = stop_delays[current_si]
-        road_cur       = current_stop["road"]
-        sched_mins_cur = current_stop["seq"]*18
-        arr_h_cur      = start_hour+sched_mins_cur//60
-        arr_m_cur      = sched_mins_cur%60
-        arr_ms_cur     = base_ts_ms+(arr_h_cur*3600+arr_m_cur*60+current_delay)*1000
-
-        remaining_seqs=list(range(current_si+1,n_stops))
-        if not remaining_seqs: continue
-        target_si   = random.choice(remaining_seqs)
-        target_stop = route_stops[target_si]
-
-        # ── segment geometry ──────────────────────────────────────────────
-        segs_remaining=[]; dist_remaining=0.0
-        for k in range(current_si,target_si):
-            key=(route_id,route_stops[k]["seq"])
-            avg_s,std_s,d_km=seg_baselines.get(key,(600,90,10))
-            segs_remaining.append((avg_s,std_s))
-            dist_remaining+=d_km
-
-        seg_times_arr=[s[0] for s in segs_remaining]
-        n_segs  = len(seg_times_arr)
-        base_tt = sum(seg_times_arr)
-        seg_avg = base_tt/n_segs if n_segs else 0
-        seg_std = float(np.std(seg_times_arr)) if n_segs>1 else 60.0
-        seg_min = min(seg_times_arr) if seg_times_arr else 0
-        seg_max = max(seg_times_arr) if seg_times_arr else 0
-        seg_var = seg_std**2
-
-        stops_remaining = target_si-current_si
-        pct_completed   = current_si/max(1,n_stops-1)
-
-        # ── schedule ──────────────────────────────────────────────────────
-        sched_mins_tgt = target_stop["seq"]*18
-        sched_h_tgt    = start_hour+sched_mins_tgt//60
-        sched_m_tgt    = sched_mins_tgt%60
-        sched_arr_ms   = base_ts_ms+(sched_h_tgt*3600+sched_m_tgt*60)*1000
-        pred_made_ms   = arr_ms_cur+random.randint(10,120)*1000
-        secs_until_sch = (sched_arr_ms-pred_made_ms)/1000
-
-        # ── delay features ─────────────────────────────────────────────────
-        if current_si>=2:
-            trend=(stop_delays[current_si]-stop_delays[current_si-2])/2
-        elif current_si>=1:
-            trend=stop_delays[current_si]-stop_delays[current_si-1]
-        else: trend=0.0
-
-        is_accel        = int(trend>30)
-        avg_delay_today = float(np.mean(stop_delays[:current_si+1]))
-        sched_adh       = clamp(1-abs(current_delay)/800,0,1)
-
-        # ── checkpoint ────────────────────────────────────────────────────
-        mins_since_ckpt  = random.uniform(0,15)
-        fresh_score      = clamp(math.exp(-mins_since_ckpt/8),0,1)
-        age_penalty      = clamp(1+mins_since_ckpt/10,1,5)
-        has_recent_ckpt  = int(mins_since_ckpt<10)
-        stops_since_ckpt = mins_since_ckpt/4
-        next_report_t    = random.uniform(30,300)
-        ckpt_reliability = clamp(hist_punc*random.uniform(0.85,1.0),0,1)
-        inferred_passed  = int(stops_since_ckpt)
-        inferred_time    = inferred_passed*seg_avg
-        time_since_last  = mins_since_ckpt*60
-
-        # ── time context ──────────────────────────────────────────────────
-        hour_pred       = arr_h_cur%24
-        is_rush         = int((7<=hour_pred<=10) or (17<=hour_pred<=20))
-        is_peak         = int((7<=hour_pred<=20) and not is_weekend)
-        mins_into_rush  = 0.0
-        if 7<=hour_pred<=10:   mins_into_rush=(hour_pred-7)*60+arr_m_cur
-        elif 17<=hour_pred<=20:mins_into_rush=(hour_pred-17)*60+arr_m_cur
-
-        same_day_hr_avg  = hist_avg*random.uniform(0.9,1.1)
-        typical_stop_del = hist_avg*clamp(random.uniform(0.7,1.3),0.5,2.0)
-
-        # ── reporter features at target stop ──────────────────────────────
-        ev_tgt     = EVENT_MAP.get((month,dom,target_stop["name"]),0)
-        base_rep   = {"city":4,"main":2,"highway":2,"mountain":1}[target_stop["road"]]
-        if is_rush: base_rep+=2
-        rep_count  = max(0,int(np.random.poisson(base_rep)))
-        rep_acc    = random.uniform(0.55,0.95) if rep_count>0 else 0.5
-        rep_density= round(rep_count/max(1,random.uniform(1,5)),3)
-        consensus  = clamp(random.uniform(0.5,1.0) if rep_count>=2 else 0.2,0,1)
-        high_qual  = int(rep_count>0 and random.random()<rep_acc*0.4)
-        cluster_t  = random.uniform(10,80) if rep_count>0 else 0.0
-
-        # ══════════════════════════════════════════════════════════════════
-        #  TARGET — delay_seconds
-        #  Causally built: propagated running delay × rush × weather × event
-        # ══════════════════════════════════════════════════════════════════
-        rm_ahead = rush_mult(hour_pred,arr_m_cur)
-        extra    = current_delay*0.70
-        extra   += weather_delay_sec(wc,target_stop["road"])*n_segs
-        extra   += np.random.normal(0,seg_std*0.15)*rm_ahead
-        if ev_tgt: extra+=ev_tgt*random.uniform(0.5,1.2)
-        extra   *= (0.92**stops_remaining)
-        delay_s  = int(round(clamp(extra,-180,2400)))
-
-        row={
-            "bus_id":bus["id"],
-            "target_stop_id":target_stop["id"],
-            "route_id":route_id,
-            "trip_id":0,
-            "prediction_made_at":round(pred_made_ms),
-            "scheduled_arrival_time":round(sched_arr_ms),
-            "seconds_until_scheduled":round(secs_until_sch,1),
-            "current_delay_seconds":float(current_delay),
-            "delay_at_last_stop":float(current_delay),
-            "avg_delay_this_route_today":round(avg_delay_today,1),
-            "avg_delay_same_hour":round(hist_avg,1),
-            "schedule_adherence_score":round(sched_adh,4),
-            "delay_trend_last_3_stops":round(trend,1),
-            "is_delay_accelerating":is_accel,
-            "delay_per_stop_rate":round(trend,2),
-            "stops_remaining":stops_remaining,
-            "pct_route_completed":round(pct_completed,4),
-            "distance_remaining_km":round(dist_remaining,3),
-            "total_segment_time_remaining":round(base_tt,1),
-            "avg_segment_time_remaining":round(seg_avg,1),
-            "stddev_segment_time":round(seg_std,1),
-            "min_segment_time":round(seg_min,1),
-            "max_segment_time":round(seg_max,1),
-            "segment_time_variance":round(seg_var,1),
-            "minutes_since_last_checkpoint":round(mins_since_ckpt,2),
-            "checkpoint_freshness_score":round(fresh_score,4),
-            "checkpoint_age_penalty":round(age_penalty,4),
-            "has_recent_checkpoint":has_recent_ckpt,
-            "stops_since_last_checkpoint":round(stops_since_ckpt,2),
-            "time_to_next_expected_report":round(next_report_t,1),
-            "checkpoint_reliability_score":round(ckpt_reliability,4),
-            "historical_delay_avg":round(hist_avg,1),
-            "historical_delay_p50":round(hist_p50,1),
-            "historical_delay_p90":round(hist_p90,1),
-            "same_day_hour_avg_delay":round(same_day_hr_avg,1),
-            "recent_24h_performance":round(clamp(hist_punc*random.uniform(0.9,1.1),0,1),4),
-            "recent_7d_performance":round(clamp(hist_punc*random.uniform(0.85,1.05),0,1),4),
-            "route_punctuality_score":round(hist_punc,4),
-            "historical_completion_rate":round(clamp(random.uniform(0.88,0.99),0,1),4),
-            "typical_delay_this_stop":round(typical_stop_del,1),
-            "historical_sample_count":random.randint(50,500),
-            "hour_of_day":hour_pred,
-            "day_of_week":dow_js,
-            "is_weekend":is_weekend,
-            "is_rush_hour":is_rush,
-            "is_peak_period":is_peak,
-            "minutes_into_rush_hour":round(mins_into_rush,1),
-            "temperature":round(temp,1),
-            "rain_1h":round(rain_mm,2),
-            "snow_1h":0.0,
-            "visibility":round(vis_m,0),
-            "wind_speed":round(wind,1),
-            "humidity":round(humid,1),
-            "weather_delay_multiplier":round(wmult,3),
-            "traffic_level_encoded":tl_base,
-            "is_holiday":is_holiday,
-            "is_special_event":int(ev_tgt>0),
-            **oh,
-            "base_travel_time":round(base_tt,1),
-            "inferred_passed_count":inferred_passed,
-            "inferred_time_consumed":round(inferred_time,1),
-            "segment_time_avg":round(seg_avg,1),
-            "time_since_last_stop":round(time_since_last,1),
-            "remaining_segment_count":n_segs,
-            "distance_to_target":round(dist_remaining,3),
-            "scheduled_delay":float(current_delay),
-            "reporters_at_target_stop":rep_count,
-            "avg_reporter_accuracy_target":round(rep_acc,4),
-            "recent_report_density":rep_density,
-            "report_consensus_strength":round(consensus,4),
-            "has_high_quality_reporter":high_qual,
-            "reporter_cluster_tightness":round(cluster_t,2),
-            "delay_seconds":delay_s,
-        }
-        rows.append(row)
-    return rows
+ROADS    = ["highway","main","mountain","city"]
+WEATHERS = ["thunderstorm","heavy_rain","rain","fog","cloudy","clear"]
+ROUTES   = sorted(STOPS_BY_ROUTE)
+MAX_STOPS = max(len(v) for v in STOPS_BY_ROUTE.values())
+
+ROUTE_N_STOPS = np.array([len(STOPS_BY_ROUTE[r]) for r in ROUTES])
+STOP_IDS  = np.zeros((len(ROUTES),MAX_STOPS),dtype=np.int64)
+STOP_ROAD = np.zeros((len(ROUTES),MAX_STOPS),dtype=np.intp)
+SEG_AVG   = np.zeros((len(ROUTES),MAX_STOPS-1))
+SEG_STD   = np.zeros((len(ROUTES),MAX_STOPS-1))
+SEG_DIST  = np.zeros((len(ROUTES),MAX_STOPS-1))
+for ri,r in enumerate(ROUTES):
+    for si,stop in enumerate(STOPS_BY_ROUTE[r]):
+        STOP_IDS[ri,si]=stop["id"]; STOP_ROAD[ri,si]=ROADS.index(stop["road"])
+        if si<len(STOPS_BY_ROUTE[r])-1:
+            SEG_AVG[ri,si],SEG_STD[ri,si],SEG_DIST[ri,si]=seg_baselines.get((r,stop["seq"]),(600,90,10))
+# prefix sums over segments: the stretch current→target is cum[target]-cum[current]
+CUM_AVG  = np.concatenate([np.zeros((len(ROUTES),1)),np.cumsum(SEG_AVG,axis=1)],axis=1)
+CUM_DIST = np.concatenate([np.zeros((len(ROUTES),1)),np.cumsum(SEG_DIST,axis=1)],axis=1)
+
+HIST = np.array([[hist_stats[(r,h)] for h in range(24)] for r in ROUTES])
+
+RAIN_MM   = np.array([12.0,8.0,3.5,0,0,0])
+VIS_M     = np.array([2000,3500,6000,1500,8000,10000])
+WIND_LO   = np.array([8,4,2,0,1,0]);         WIND_HI = np.array([18,10,7,3,5,4])
+HUM_LO    = np.array([88,82,75,80,60,45]);   HUM_HI  = np.array([100,97,92,95,80,70])
+WMULT     = np.array([2.2,1.7,1.3,1.25,1.05,1.0])
+# mean weather delay per segment, [weather, road]
+WEATHER_DELAY = np.array([
+    [100,160,360,240],
+    [70,110,260,180],
+    [30,45,120,60],
+    [25,35,90,45],
+    [5,8,15,10],
+    [0,0,0,0],
+],dtype=np.float64)
+ONEHOT_OF_WEATHER = {"weather_clear":[5],"weather_rain":[1,2],"weather_snow":[],"weather_fog":[3],
+                     "weather_clouds":[4],"weather_thunderstorm":[0],"weather_unknown":[]}
+BASE_REPORTERS = np.array([2,2,1,4])
+
+INT_COLS=["bus_id","target_stop_id","route_id","trip_id",
+          "is_delay_accelerating","has_recent_checkpoint",
+          "hour_of_day","day_of_week","is_weekend","is_rush_hour",
+          "is_peak_period","is_holiday","is_special_event",
+          "weather_clear","weather_rain","weather_snow","weather_fog",
+          "weather_clouds","weather_thunderstorm","weather_unknown",
+          "traffic_level_encoded","historical_sample_count",
+          "stops_remaining","remaining_segment_count","inferred_passed_count",
+          "reporters_at_target_stop","has_high_quality_reporter",
+          "stops_since_last_checkpoint","delay_seconds"]
+
+WEEKDAY_STARTS=[5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20]
+WEEKEND_STARTS=[6,8,10,12,14,16,18,20]
+BASE_DATE=datetime(2024,7,1,tzinfo=timezone.utc)
 
 # ══════════════════════════════════════════════════════════════════════════════
-#  MAIN
+#  VECTORIZED DRAWS  (one value per trip / stop / row)
 # ══════════════════════════════════════════════════════════════════════════════
 
-WEEKDAY_STARTS=[5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20]
-WEEKEND_STARTS=[6,8,10,12,14,16,18,20]
+def uniform(rng, lo, hi, size=None):
+    lo=np.asarray(lo,dtype=np.float64)
+    return lo+(hi-lo)*rng.random(size if size is not None else lo.shape)
+
+def rush_mult(rng, t):
+    bands=[(7.0<=t)&(t<=9.5),(11.5<=t)&(t<=13.0),(16.0<=t)&(t<=19.5),t<6.5]
+    lo=np.select(bands,[1.8,1.1,1.5,0.5],1.0)
+    hi=np.select(bands,[3.5,1.4,3.0,0.85],1.0)
+    return uniform(rng,lo,hi)
 
-def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE):
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    BASE_DATE=datetime(2024,7,1,tzinfo=timezone.utc)
-    all_rows,day=[],0
+def draw_weather(rng, month):
+    rp=np.array(MONTHLY_RAIN_PROB)[month]
+    r=rng.random(len(month))
+    thresholds=np.stack([rp*0.10,rp*0.25,rp,rp+0.08,rp+0.22],axis=1)
+    return (r[:,None]>=thresholds).sum(axis=1)
 
-    print(f"Generating ≈{n_rows:,} rows …")
+def weather_delay_sec(rng, wc, road):
+    mean=WEATHER_DELAY[wc,road]
+    return np.maximum(0,rng.normal(mean,mean*0.3))
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SHARD SIMULATOR
+# ══════════════════════════════════════════════════════════════════════════════
 
-    while len(all_rows)<n_rows:
-        date    = BASE_DATE+timedelta(days=day%365)
-        starts  = WEEKEND_STARTS if date.weekday()>=5 else WEEKDAY_STARTS
-        base_ms = int(date.timestamp()*1000)
+def day_info(day):
+    date=BASE_DATE+timedelta(days=day%365)
+    starts=WEEKEND_STARTS if date.weekday()>=5 else WEEKDAY_STARTS
+    return date,starts
+
+def rows_per_day(day):
+    _,starts=day_info(day)
+    return len(starts)*sum(int(ROUTE_N_STOPS[ROUTES.index(b["route"])])-1 for b in BUSES)
+
+def simulate_shard(first_day, n_days, rng):
+    """Columns for every trip of every bus over n_days, in (day, bus, start hour) order."""
+    # ── one entry per trip ────────────────────────────────────────────────
+    trip_day,trip_bus,trip_route,trip_start,trip_events=[],[],[],[],[]
+    for day in range(first_day,first_day+n_days):
+        date,starts=day_info(day)
         for bus in BUSES:
+            ri=ROUTES.index(bus["route"])
+            ev=[EVENT_MAP.get((date.month-1,date.day,s["name"]),0) for s in STOPS_BY_ROUTE[bus["route"]]]
+            ev+=[0]*(MAX_STOPS-len(ev))
             for sh in starts:
-                all_rows.extend(simulate_trip(bus,date,sh,base_ms))
-        day+=1
-        if day%10==0:
-            pct=min(100,len(all_rows)*100//n_rows)
-            print(f"  day {day:3d} | rows {len(all_rows):8,} ({pct}%)")
-
-    all_rows=all_rows[:n_rows]
-    df=pd.DataFrame(all_rows)
-
-    int_cols=["bus_id","target_stop_id","route_id","trip_id",
-              "is_delay_accelerating","has_recent_checkpoint",
-              "hour_of_day","day_of_week","is_weekend","is_rush_hour",
-              "is_peak_period","is_holiday","is_special_event",
-              "weather_clear","weather_rain","weather_snow","weather_fog",
-              "weather_clouds","weather_thunderstorm","weather_unknown",
-              "traffic_level_encoded","historical_sample_count",
-              "stops_remaining","remaining_segment_count","inferred_passed_count",
-              "reporters_at_target_stop","has_high_quality_reporter",
-              "stops_since_last_checkpoint","delay_seconds"]
-    for c in int_cols:
-        if c in df.columns:
-            df[c]=df[c].fillna(0).astype(int)
-    df.fillna(0.0,inplace=True)
-    df.to_csv(output_path,index=False)
-
-    print(f"\n✓ Saved {len(df):,} rows → {output_path}")
+                trip_day.append(day); trip_bus.append(bus["id"]); trip_route.append(ri)
+                trip_start.append(sh); trip_events.append(ev)
+    t_route=np.array(trip_route); t_start=np.array(trip_start); t_bus=np.array(trip_bus)
+    t_events=np.array(trip_events,dtype=np.float64)
+    dates=[BASE_DATE+timedelta(days=d%365) for d in trip_day]
+    t_month=np.array([d.month-1 for d in dates]); t_dom=np.array([d.day for d in dates])
+    t_weekday=np.array([d.weekday() for d in dates])
+    t_base_ms=np.array([int(d.timestamp()*1000) for d in dates],dtype=np.float64)
+    t_dow_js=(t_weekday+1)%7
+    t_weekend=(t_weekday>=5).astype(np.int64)
+    t_holiday=np.array([(m,d) in SL_HOLIDAYS for m,d in zip(t_month,t_dom)],dtype=np.int64)
+    t_n=ROUTE_N_STOPS[t_route]
+    T=len(t_route)
+
+    wc=draw_weather(rng,t_month)
+    rain_mm=np.maximum(0,RAIN_MM[wc]+uniform(rng,-.3,.3,T))
+    vis_m=np.maximum(0,VIS_M[wc]+uniform(rng,-200,200,T))
+    wind=np.maximum(0,uniform(rng,WIND_LO[wc],WIND_HI[wc]))
+    humid=np.clip(uniform(rng,HUM_LO[wc],HUM_HI[wc]),0,100)
+    stormy=wc<=1
+    temp=np.where(stormy,uniform(rng,20,27,T),uniform(rng,24,32,T))
+    wmult=WMULT[wc]
+    rush_start=((7<=t_start)&(t_start<=9))|((17<=t_start)&(t_start<=19))
+    tl_base=np.where(rush_start&stormy,3,np.where(rush_start,2,1))
+
+    # ── propagate delay through all stops, every trip at once ────────────
+    running=rng.normal(0,40,T)
+    stop_delays=np.zeros((T,MAX_STOPS))
+    for si in range(MAX_STOPS):
+        road=STOP_ROAD[t_route,si]
+        rm=rush_mult(rng,t_start+si*0.3)
+        if si>0:
+            running=running+rng.normal(0,SEG_STD[t_route,si-1]*0.25)*rm+weather_delay_sec(rng,wc,road)
+        else:
+            running=np.clip(running,-90,180)
+        running=running+np.where(rng.random(T)<0.004,rng.integers(300,1201,T),0)
+        ev=t_events[:,si]
+        running=running+np.where(ev>0,ev*uniform(rng,0.6,1.4,T),0)
+        if si>0:
+            running=np.where(running>0,running*uniform(rng,0.86,0.95,T),np.maximum(-120,running))
+        stop_delays[:,si]=np.round(running)
+
+    # ── one row per (trip, current stop) ─────────────────────────────────
+    per_trip=t_n-1
+    t=np.repeat(np.arange(T),per_trip)
+    cur=np.arange(len(t))-np.repeat(np.cumsum(per_trip)-per_trip,per_trip)
+    R=len(t)
+    route=t_route[t]; n_stops=t_n[t]; start=t_start[t]; weekend=t_weekend[t]
+    current_delay=stop_delays[t,cur]
+    sched_mins_cur=(cur+1)*18
+    arr_h_cur=start+sched_mins_cur//60
+    arr_m_cur=sched_mins_cur%60
+    arr_ms_cur=t_base_ms[t]+(arr_h_cur*3600+arr_m_cur*60+current_delay)*1000
+
+    target=cur+1+np.floor(rng.random(R)*(n_stops-1-cur)).astype(np.int64)
+
+    # ── segment geometry from prefix sums ────────────────────────────────
+    n_segs=target-cur
+    base_tt=CUM_AVG[route,target]-CUM_AVG[route,cur]
+    dist_remaining=CUM_DIST[route,target]-CUM_DIST[route,cur]
+    seg_avg=base_tt/n_segs
+    k=np.arange(MAX_STOPS-1)
+    in_range=(k>=cur[:,None])&(k<target[:,None])
+    segs=SEG_AVG[route]
+    seg_std=np.sqrt(np.where(in_range,(segs-seg_avg[:,None])**2,0).sum(axis=1)/n_segs)
+    seg_std=np.where(n_segs>1,seg_std,60.0)
+    seg_min=np.where(in_range,segs,np.inf).min(axis=1)
+    seg_max=np.where(in_range,segs,-np.inf).max(axis=1)
+    seg_var=seg_std**2
+    pct_completed=cur/np.maximum(1,n_stops-1)
+
+    # ── schedule ─────────────────────────────────────────────────────────
+    sched_mins_tgt=(target+1)*18
+    sched_arr_ms=t_base_ms[t]+((start+sched_mins_tgt//60)*3600+(sched_mins_tgt%60)*60)*1000
+    pred_made_ms=arr_ms_cur+rng.integers(10,121,R)*1000
+    secs_until_sch=(sched_arr_ms-pred_made_ms)/1000
+
+    # ── delay features ───────────────────────────────────────────────────
+    prev1=stop_delays[t,np.maximum(cur-1,0)]; prev2=stop_delays[t,np.maximum(cur-2,0)]
+    trend=np.where(cur>=2,(current_delay-prev2)/2,np.where(cur>=1,current_delay-prev1,0.0))
+    is_accel=(trend>30).astype(np.int64)
+    avg_delay_today=np.cumsum(stop_delays,axis=1)[t,cur]/(cur+1)
+    sched_adh=np.clip(1-np.abs(current_delay)/800,0,1)
+
+    # ── checkpoint ───────────────────────────────────────────────────────
+    hist=HIST[route,start%24]
+    hist_avg,hist_p50,hist_p90,hist_punc=hist[:,0],hist[:,1],hist[:,2],hist[:,3]
+    mins_since_ckpt=uniform(rng,0,15,R)
+    fresh_score=np.clip(np.exp(-mins_since_ckpt/8),0,1)
+    age_penalty=np.clip(1+mins_since_ckpt/10,1,5)
+    has_recent_ckpt=(mins_since_ckpt<10).astype(np.int64)
+    stops_since_ckpt=mins_since_ckpt/4
+    next_report_t=uniform(rng,30,300,R)
+    ckpt_reliability=np.clip(hist_punc*uniform(rng,0.85,1.0,R),0,1)
+    inferred_passed=stops_since_ckpt.astype(np.int64)
+    inferred_time=inferred_passed*seg_avg
+    time_since_last=mins_since_ckpt*60
+
+    # ── time context ─────────────────────────────────────────────────────
+    hour_pred=arr_h_cur%24
+    is_rush=(((7<=hour_pred)&(hour_pred<=10))|((17<=hour_pred)&(hour_pred<=20))).astype(np.int64)
+    is_peak=((7<=hour_pred)&(hour_pred<=20)&(weekend==0)).astype(np.int64)
+    mins_into_rush=np.where((7<=hour_pred)&(hour_pred<=10),(hour_pred-7)*60+arr_m_cur,
+                   np.where((17<=hour_pred)&(hour_pred<=20),(hour_pred-17)*60+arr_m_cur,0)).astype(np.float64)
+    same_day_hr_avg=hist_avg*uniform(rng,0.9,1.1,R)
+    typical_stop_del=hist_avg*np.clip(uniform(rng,0.7,1.3,R),0.5,2.0)
+
+    # ── reporter features at target stop ─────────────────────────────────
+    target_road=STOP_ROAD[route,target]
+    ev_tgt=t_events[t,target]
+    rep_count=rng.poisson(BASE_REPORTERS[target_road]+2*is_rush)
+    has_rep=rep_count>0
+    rep_acc=np.where(has_rep,uniform(rng,0.55,0.95,R),0.5)
+    rep_density=np.round(rep_count/np.maximum(1,uniform(rng,1,5,R)),3)
+    consensus=np.clip(np.where(rep_count>=2,uniform(rng,0.5,1.0,R),0.2),0,1)
+    high_qual=(has_rep&(rng.random(R)<rep_acc*0.4)).astype(np.int64)
+    cluster_t=np.where(has_rep,uniform(rng,10,80,R),0.0)
+
+    # ══════════════════════════════════════════════════════════════════════
+    #  TARGET — delay_seconds
+    #  Causally built: propagated running delay × rush × weather × event
+    # ══════════════════════════════════════════════════════════════════════
+    rm_ahead=rush_mult(rng,hour_pred+arr_m_cur/60)
+    trip_wc=wc[t]
+    extra=current_delay*0.70
+    extra=extra+weather_delay_sec(rng,trip_wc,target_road)*n_segs
+    extra=extra+rng.normal(0,seg_std*0.15)*rm_ahead
+    extra=extra+np.where(ev_tgt>0,ev_tgt*uniform(rng,0.5,1.2,R),0)
+    extra=extra*(0.92**n_segs)
+    delay_s=np.round(np.clip(extra,-180,2400))
+
+    columns={
+        "bus_id":t_bus[t],
+        "target_stop_id":STOP_IDS[route,target],
+        "route_id":np.array(ROUTES)[route],
+        "trip_id":np.zeros(R,dtype=np.int64),
+        "prediction_made_at":np.round(pred_made_ms).astype(np.int64),
+        "scheduled_arrival_time":np.round(sched_arr_ms).astype(np.int64),
+        "seconds_until_scheduled":np.round(secs_until_sch,1),
+        "current_delay_seconds":current_delay,
+        "delay_at_last_stop":current_delay,
+        "avg_delay_this_route_today":np.round(avg_delay_today,1),
+        "avg_delay_same_hour":np.round(hist_avg,1),
+        "schedule_adherence_score":np.round(sched_adh,4),
+        "delay_trend_last_3_stops":np.round(trend,1),
+        "is_delay_accelerating":is_accel,
+        "delay_per_stop_rate":np.round(trend,2),
+        "stops_remaining":n_segs,
+        "pct_route_completed":np.round(pct_completed,4),
+        "distance_remaining_km":np.round(dist_remaining,3),
+        "total_segment_time_remaining":np.round(base_tt,1),
+        "avg_segment_time_remaining":np.round(seg_avg,1),
+        "stddev_segment_time":np.round(seg_std,1),
+        "min_segment_time":np.round(seg_min,1),
+        "max_segment_time":np.round(seg_max,1),
+        "segment_time_variance":np.round(seg_var,1),
+        "minutes_since_last_checkpoint":np.round(mins_since_ckpt,2),
+        "checkpoint_freshness_score":np.round(fresh_score,4),
+        "checkpoint_age_penalty":np.round(age_penalty,4),
+        "has_recent_checkpoint":has_recent_ckpt,
+        "stops_since_last_checkpoint":np.round(stops_since_ckpt,2),
+        "time_to_next_expected_report":np.round(next_report_t,1),
+        "checkpoint_reliability_score":np.round(ckpt_reliability,4),
+        "historical_delay_avg":np.round(hist_avg,1),
+        "historical_delay_p50":np.round(hist_p50,1),
+        "historical_delay_p90":np.round(hist_p90,1),
+        "same_day_hour_avg_delay":np.round(same_day_hr_avg,1),
+        "recent_24h_performance":np.round(np.clip(hist_punc*uniform(rng,0.9,1.1,R),0,1),4),
+        "recent_7d_performance":np.round(np.clip(hist_punc*uniform(rng,0.85,1.05,R),0,1),4),
+        "route_punctuality_score":np.round(hist_punc,4),
+        "historical_completion_rate":np.round(uniform(rng,0.88,0.99,R),4),
+        "typical_delay_this_stop":np.round(typical_stop_del,1),
+        "historical_sample_count":rng.integers(50,501,R),
+        "hour_of_day":hour_pred,
+        "day_of_week":t_dow_js[t],
+        "is_weekend":weekend,
+        "is_rush_hour":is_rush,
+        "is_peak_period":is_peak,
+        "minutes_into_rush_hour":np.round(mins_into_rush,1),
+        "temperature":np.round(temp,1)[t],
+        "rain_1h":np.round(rain_mm,2)[t],
+        "snow_1h":np.zeros(R),
+        "visibility":np.round(vis_m,0)[t],
+        "wind_speed":np.round(wind,1)[t],
+        "humidity":np.round(humid,1)[t],
+        "weather_delay_multiplier":np.round(wmult,3)[t],
+        "traffic_level_encoded":tl_base[t],
+        "is_holiday":t_holiday[t],
+        "is_special_event":(ev_tgt>0).astype(np.int64),
+        **{name:np.isin(trip_wc,codes).astype(np.int64) for name,codes in ONEHOT_OF_WEATHER.items()},
+        "base_travel_time":np.round(base_tt,1),
+        "inferred_passed_count":inferred_passed,
+        "inferred_time_consumed":np.round(inferred_time,1),
+        "segment_time_avg":np.round(seg_avg,1),
+        "time_since_last_stop":np.round(time_since_last,1),
+        "remaining_segment_count":n_segs,
+        "distance_to_target":np.round(dist_remaining,3),
+        "scheduled_delay":current_delay,
+        "reporters_at_target_stop":rep_count,
+        "avg_reporter_accuracy_target":np.round(rep_acc,4),
+        "recent_report_density":rep_density,
+        "report_consensus_strength":np.round(consensus,4),
+        "has_high_quality_reporter":high_qual,
+        "reporter_cluster_tightness":np.round(cluster_t,2),
+        "delay_seconds":delay_s,
+    }
+    df=pd.DataFrame(columns)
+    for c in INT_COLS:
+        df[c]=df[c].astype(np.int64)
+    return df
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  SHARDED OUTPUT
+# ══════════════════════════════════════════════════════════════════════════════
+
+def plan_shards(n_rows, days_per_shard):
+    """(shard index, first day, days, row limit) covering at least n_rows, in output order."""
+    shards,day,total=[],0,0
+    while total<n_rows:
+        first=day; rows=0
+        while day<first+days_per_shard and total+rows<n_rows:
+            rows+=rows_per_day(day); day+=1
+        shards.append((len(shards),first,day-first,min(rows,n_rows-total)))
+        total+=rows
+    return shards
+
+def write_parquet(df, root):
+    from schemas.eta_features import ETAFeatures
+    from storage.parquet_dataset import arrow_schema, write_partitioned
+    import pyarrow as pa
+
+    schema=arrow_schema(ETAFeatures,"delay_seconds")
+    table=pa.Table.from_pandas(df,schema=schema,preserve_index=False)
+    months=df["prediction_made_at"].to_numpy().astype("datetime64[ms]").astype("datetime64[M]").astype(str)
+    write_partitioned(table.append_column("month",pa.array(months,type=pa.string())),root)
+
+def run_shard(shard, first_day, n_days, limit, seed, fmt, out, keep_frame):
+    """Simulate one shard with its own generator; Parquet shards are written from the worker."""
+    rng=np.random.default_rng([seed,shard])
+    df=simulate_shard(first_day,n_days,rng).iloc[:limit]
+    if fmt=="parquet":
+        write_parquet(df,out)
+        return len(df),(df if keep_frame else None)
+    return len(df),df
+
+def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE, fmt="csv", workers=None, days_per_shard=DAYS_PER_SHARD, seed=SEED):
+    """Write n_rows to output_path and return the number of rows written (not the DataFrame, as it
+    used to: shards are written as they finish and never held in memory together)."""
+    if fmt=="csv":
+        os.makedirs(os.path.dirname(output_path) or ".",exist_ok=True)
+        if os.path.exists(output_path): os.remove(output_path)
+    else:
+        os.makedirs(output_path,exist_ok=True)
+    shards=plan_shards(n_rows,days_per_shard)
+    workers=max(1,min(workers or os.cpu_count() or 1,len(shards)))
+
+    print(f"Generating {n_rows:,} rows in {len(shards)} shards of ≤{days_per_shard} days on {workers} workers …")
+    started=time.perf_counter(); written=0; sample=None
+
+    with ProcessPoolExecutor(max_workers=workers,mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures=[pool.submit(run_shard,shard,first,days,limit,seed,fmt,output_path,shard==0)
+                 for shard,first,days,limit in shards]
+        # results are consumed in shard order, so the CSV is appended deterministically
+        for future in futures:
+            rows,df=future.result()
+            if fmt=="csv":
+                df.to_csv(output_path,mode="a",header=written==0,index=False)
+            if sample is None:
+                sample=df
+            written+=rows
+            elapsed=time.perf_counter()-started
+            print(f"  rows {written:>12,} ({written*100//n_rows:3d}%) | {written/elapsed:>10,.0f} rows/s")
+
+    print(f"\n✓ Saved {written:,} rows → {output_path}  ({time.perf_counter()-started:.1f}s)")
+    summarize(sample)
+    return written
+
+def summarize(df):
+    print(f"\nSummary of the first shard ({len(df):,} rows)")
     print(f"  Columns : {len(df.columns)} | Routes: {df['route_id'].nunique()} | "
           f"Buses: {df['bus_id'].nunique()} | Target stops: {df['target_stop_id'].nunique()}")
 
@@ -480,7 +568,14 @@ def generate(n_rows=NUM_ROWS, output_path=OUTPUT_FILE):
     for feat,corr in corrs.head(10).items():
         print(f"  {feat:<42}: {corr:.4f}")
 
-    return df
-
 if __name__=="__main__":
-    df=generate()
\ No newline at end of file
+    parser=argparse.ArgumentParser(description="Generate synthetic ETA training data")
+    parser.add_argument("--rows",type=int,default=NUM_ROWS)
+    parser.add_argument("--format",choices=("csv","parquet"),default="csv")
+    parser.add_argument("--out",help="CSV file, or dataset directory for --format parquet")
+    parser.add_argument("--workers",type=int,help="processes (default: one per CPU)")
+    parser.add_argument("--days-per-shard",type=int,default=DAYS_PER_SHARD)
+    parser.add_argument("--seed",type=int,default=SEED)
+    args=parser.parse_args()
+    out=args.out or (OUTPUT_FILE if args.format=="csv" else DATASET_DIR)
+    generate(args.rows,out,fmt=args.format,workers=args.workers,days_per_shard=args.days_per_shard,seed=args.seed)
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+# upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one vectorized call.
+
+    The first request opens a batch; it is flushed when it reaches max_batch rows or
+    max_wait seconds after it opened, whichever comes first. predict_batch takes a list
+    of inputs and returns one result per input; it is run through `run` (by default a
+    plain worker thread) so it stays off the event loop.
+    """
+
+    def __init__(self, name, predict_batch, max_wait=0.002, max_batch=64, run=None):
+        self.name = name
+        self.predict_batch = predict_batch
+        self.run = run or asyncio.to_thread
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+
+        self._items = []
+        self._futures = []
+        self._timer = None
+        # the loop only holds tasks weakly; an in-flight batch dropped by the GC would
+        # leave every caller waiting on it forever
+        self._tasks = set()
+
+        self.batches = 0
+        self.rows = 0
+        self.full_flushes = 0
+        self.size_histogram = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.size_histogram["+Inf"] = 0
+        self.predict_seconds = 0.0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._items.append(item)
+        self._futures.append(future)
+
+        if len(self._items) >= self.max_batch:
+            self.full_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, futures = self._items, self._futures
+        self._items, self._futures = [], []
+        if items:
+            self._record(len(items))
+            task = asyncio.ensure_future(self._run(items, futures))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self, timeout=5.0):
+        """Flush the open batch and wait for in-flight batches; cancel any still running after timeout."""
+        self._flush()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run(self, items, futures):
+        started = time.perf_counter()
+        try:
+            results = await self.run(self.predict_batch, items)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.predict_seconds += time.perf_counter() - started
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, size):
+        self.batches += 1
+        self.rows += size
+        for bucket in BATCH_SIZE_BUCKETS:
+            if size <= bucket:
+                self.size_histogram[bucket] += 1
+                break
+        else:
+            self.size_histogram["+Inf"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "full_flushes": self.full_flushes,
+            "pending": len(self._items),
+            "predict_seconds": round(self.predict_seconds, 4),
+            "batch_size_histogram": {str(k): v for k, v in self.size_histogram.items()},
+        }
@@ -0,0 +1,387 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+import numpy as np
+from monitoring.log import get_logger
+
+log = get_logger("models")
+
+# how a row is fed to the comparisons: rounded to float32 (sklearn, XGBoost), as float64
+# (LightGBM), or both side by side when a stack mixes the two
+FLOAT64_INPUTS, FLOAT32_INPUTS, MIXED_INPUTS = 0, 1, 2
+
+class CompiledEnsemble:
+    """A tree ensemble flattened into parallel node arrays.
+
+    Every tree is stored in the same arrays, with leaves pointing back at themselves, so
+    walking all trees `depth` times from `roots` lands every tree on its leaf. A row is
+    routed right when x[feature] > threshold, which is the `<=` test sklearn and LightGBM
+    use; XGBoost's `<` split is turned into `<=` on the next float32 below the threshold.
+
+    A stack of ensembles (see `stack`) keeps one output per member: `tree_output` says
+    which output each tree adds to and `bases` holds each output's starting value.
+    """
+
+    ARRAYS = ("feature", "threshold", "children", "value", "roots", "meta")
+    OPTIONAL_ARRAYS = ("tree_output", "bases")
+
+    def __init__(self, feature, threshold, children, value, roots, depth, base=0.0,
+                 float32_inputs=True, input_mode=None, n_features=0, tree_output=None, bases=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.ascontiguousarray(children, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.depth = int(depth)
+        self.base = float(base)
+        if input_mode is None:
+            input_mode = FLOAT32_INPUTS if float32_inputs else FLOAT64_INPUTS
+        self.input_mode = int(input_mode)
+        self.float32_inputs = self.input_mode == FLOAT32_INPUTS
+        self.n_features = int(n_features)
+
+        self.tree_output = None if tree_output is None else np.ascontiguousarray(tree_output, dtype=np.intp)
+        self.bases = None if bases is None else np.ascontiguousarray(bases, dtype=np.float64)
+        self._output_matrix = None
+        if self.tree_output is not None:
+            # summing leaves per output is one matmul with a one-hot tree -> output matrix
+            self._output_matrix = np.zeros((len(self.roots), len(self.bases)))
+            self._output_matrix[np.arange(len(self.roots)), self.tree_output] = 1.0
+        self._local = threading.local()
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_outputs(self) -> int:
+        return 1 if self.bases is None else len(self.bases)
+
+    @classmethod
+    def stack(cls, ensembles):
+        """Merge several single-output ensembles over the same features into one multi-output walk."""
+        n_features = max(e.n_features for e in ensembles)
+        modes = {e.input_mode for e in ensembles}
+        input_mode = modes.pop() if len(modes) == 1 else MIXED_INPUTS
+
+        feature, threshold, children, value, roots, tree_output = [], [], [], [], [], []
+        offset = 0
+        for i, e in enumerate(ensembles):
+            f = np.asarray(e.feature)
+            if input_mode == MIXED_INPUTS and e.input_mode == FLOAT64_INPUTS:
+                # float64 members read the second half of the widened row
+                f = f + n_features
+            feature.append(f)
+            threshold.append(e.threshold)
+            children.append(np.asarray(e.children) + offset)
+            value.append(e.value)
+            roots.append(np.asarray(e.roots) + offset)
+            tree_output.append(np.full(e.n_trees, i, dtype=np.intp))
+            offset += len(e.feature)
+        return cls(
+            np.concatenate(feature), np.concatenate(threshold), np.concatenate(children),
+            np.concatenate(value), np.concatenate(roots), max(e.depth for e in ensembles),
+            input_mode=input_mode, n_features=n_features, tree_output=np.concatenate(tree_output),
+            bases=[e.base for e in ensembles]
+        )
+
+    def _prepare(self, X):
+        if self.input_mode == FLOAT32_INPUTS:
+            return X.astype(np.float32)
+        if self.input_mode == MIXED_INPUTS:
+            return np.concatenate((X.astype(np.float32), X), axis=-1)
+        return X.astype(np.float64, copy=False)
+
+    def _scratch(self):
+        scratch = getattr(self._local, "scratch", None)
+        if scratch is None:
+            n = len(self.roots)
+            scratch = self._local.scratch = (
+                np.empty(n, dtype=np.intp),
+                np.empty(n, dtype=np.intp),
+                np.empty(n, dtype=np.float32 if self.float32_inputs else np.float64),
+                np.empty(n, dtype=np.float64),
+                np.empty(n, dtype=bool),
+                np.empty(n, dtype=np.float64),
+            )
+        return scratch
+
+    def _combine(self, leaves):
+        if self._output_matrix is None:
+            return self.base + leaves.sum(axis=-1)
+        return self.bases + leaves @ self._output_matrix
+
+    def predict_one(self, x):
+        """Score a single feature row without allocating per-node temporaries.
+
+        Returns a float, or one value per output for a stacked ensemble.
+        """
+        x = self._prepare(x)
+        node, idx, xv, tv, right, leaves = self._scratch()
+        node[:] = self.roots
+        for _ in range(self.depth):
+            np.take(self.feature, node, out=idx)
+            np.take(x, idx, out=xv)
+            np.take(self.threshold, node, out=tv)
+            np.greater(xv, tv, out=right)
+            np.multiply(node, 2, out=idx)
+            np.add(idx, right, out=idx)
+            np.take(self.children, idx, out=node)
+        np.take(self.value, node, out=leaves)
+        if self._output_matrix is None:
+            return self.base + float(leaves.sum())
+        return self._combine(leaves)
+
+    def predict(self, X) -> np.ndarray:
+        """Scores with shape (n_rows,), or (n_rows, n_outputs) for a stacked ensemble."""
+        X = np.asarray(X)
+        if X.shape[0] == 1:
+            return np.asarray(self.predict_one(X[0]), dtype=np.float64)[None, ...]
+
+        X = self._prepare(X)
+        flat = X.ravel()
+        # offset of each row in the flattened matrix, broadcast over trees
+        row_offset = (np.arange(X.shape[0], dtype=np.intp) * X.shape[1])[:, None]
+        node = np.broadcast_to(self.roots, (X.shape[0], len(self.roots))).copy()
+        idx = np.empty_like(node)
+        for _ in range(self.depth):
+            np.take(self.feature, node, out=idx)
+            np.add(idx, row_offset, out=idx)
+            right = flat[idx] > self.threshold[node]
+            np.multiply(node, 2, out=idx)
+            np.add(idx, right, out=idx)
+            np.take(self.children, idx, out=node)
+        return self._combine(self.value[node])
+
+    def arrays(self) -> dict:
+        arrays = {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children": self.children,
+            "value": self.value,
+            "roots": self.roots,
+            "meta": np.array([self.depth, self.base, self.input_mode, self.n_features], dtype=np.float64),
+        }
+        if self.tree_output is not None:
+            arrays["tree_output"] = self.tree_output
+            arrays["bases"] = self.bases
+        return arrays
+
+    def save(self, path: str):
+        """Write each array as its own .npy file under path, so they can be memory-mapped."""
+        os.makedirs(path, exist_ok=True)
+        for key, array in self.arrays().items():
+            np.save(os.path.join(path, f"{key}.npy"), array)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode="r"):
+        # read-only maps are backed by the page cache, so every worker shares one copy
+        data = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode=mmap_mode) for key in cls.ARRAYS}
+        for key in cls.OPTIONAL_ARRAYS:
+            if os.path.exists(os.path.join(path, f"{key}.npy")):
+                data[key] = np.load(os.path.join(path, f"{key}.npy"))
+        meta = np.asarray(data.pop("meta"))
+        n_features = int(meta[3]) if len(meta) > 3 else 0
+        return cls(**data, depth=int(meta[0]), base=meta[1], input_mode=int(meta[2]), n_features=n_features)
+
+class _Builder:
+    """Accumulates trees node by node into the flat arrays."""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right, self.value = [], [], [], [], []
+        self.roots = []
+        self.depth = 0
+
+    def add_node(self) -> int:
+        self.feature.append(0)
+        self.threshold.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.value.append(0.0)
+        return len(self.feature) - 1
+
+    def split(self, node, feature, threshold, left, right):
+        self.feature[node] = feature
+        self.threshold[node] = threshold
+        self.left[node] = left
+        self.right[node] = right
+
+    def leaf(self, node, value):
+        self.value[node] = value
+        self.left[node] = node
+        self.right[node] = node
+
+    def build(self, base=0.0, float32_inputs=True) -> CompiledEnsemble:
+        children = np.empty(2 * len(self.left), dtype=np.intp)
+        children[0::2] = self.left
+        children[1::2] = self.right
+        return CompiledEnsemble(
+            self.feature, self.threshold, children, self.value, self.roots,
+            self.depth, base=base, float32_inputs=float32_inputs
+        )
+
+def _add_sklearn_tree(builder, tree, scale):
+    offset = len(builder.feature)
+    leaf_values = tree.value[:, 0, 0] * scale
+    for _ in range(tree.node_count):
+        builder.add_node()
+    for i in range(tree.node_count):
+        if tree.children_left[i] == -1:
+            builder.leaf(offset + i, leaf_values[i])
+        else:
+            builder.split(
+                offset + i, int(tree.feature[i]), float(tree.threshold[i]),
+                offset + int(tree.children_left[i]), offset + int(tree.children_right[i])
+            )
+    builder.roots.append(offset)
+    builder.depth = max(builder.depth, int(tree.max_depth))
+
+def _compile_sklearn(reg):
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    builder = _Builder()
+    if isinstance(reg, GradientBoostingRegressor):
+        if reg.init_ == "zero":
+            base = 0.0
+        else:
+            base = float(np.ravel(reg.init_.predict(np.zeros((1, reg.n_features_in_))))[0])
+        for stage in reg.estimators_:
+            _add_sklearn_tree(builder, stage[0].tree_, reg.learning_rate)
+    else:
+        base = 0.0
+        for est in reg.estimators_:
+            _add_sklearn_tree(builder, est.tree_, 1.0 / len(reg.estimators_))
+    return builder.build(base=base, float32_inputs=True)
+
+def _compile_lightgbm(reg):
+    booster = reg.booster_
+    dump = booster.dump_model(num_iteration=reg.best_iteration_ or None)
+    if dump.get("num_tree_per_iteration", 1) != 1:
+        return None
+    builder = _Builder()
+
+    def walk(node, depth):
+        idx = builder.add_node()
+        if "leaf_value" in node or "split_feature" not in node:
+            builder.leaf(idx, node.get("leaf_value", 0.0))
+            return idx, depth
+        if node["decision_type"] != "<=" or node.get("missing_type") == "Zero":
+            raise ValueError("unsupported LightGBM split")
+        left, left_depth = walk(node["left_child"], depth + 1)
+        right, right_depth = walk(node["right_child"], depth + 1)
+        builder.split(idx, node["split_feature"], node["threshold"], left, right)
+        return idx, max(left_depth, right_depth)
+
+    for tree in dump["tree_info"]:
+        root, depth = walk(tree["tree_structure"], 0)
+        builder.roots.append(root)
+        builder.depth = max(builder.depth, depth)
+    return builder.build(base=0.0, float32_inputs=False)
+
+def _xgboost_base_score(booster) -> float:
+    base = json.loads(booster.save_config())["learner"]["learner_model_param"]["base_score"]
+    return float(str(base).strip("[]"))
+
+def _compile_xgboost(reg):
+    booster = reg.get_booster()
+    if reg.objective not in (None, "reg:squarederror"):
+        return None
+    names = booster.feature_names
+    feature_ids = {name: i for i, name in enumerate(names)} if names else {}
+    trees = booster.get_dump(dump_format="json")
+    best_iteration = getattr(reg, "best_iteration", None)
+    if best_iteration is not None:
+        trees = trees[:best_iteration + 1]
+    builder = _Builder()
+
+    def walk(node, depth):
+        idx = builder.add_node()
+        if "leaf" in node:
+            builder.leaf(idx, node["leaf"])
+            return idx, depth
+        split = node["split"]
+        feature = feature_ids[split] if split in feature_ids else int(split.lstrip("f"))
+        by_id = {child["nodeid"]: child for child in node["children"]}
+        left, left_depth = walk(by_id[node["yes"]], depth + 1)
+        right, right_depth = walk(by_id[node["no"]], depth + 1)
+        # x < t on float32 inputs is x <= the float32 just below t
+        threshold = np.nextafter(np.float32(node["split_condition"]), np.float32(-np.inf))
+        builder.split(idx, feature, float(threshold), left, right)
+        return idx, max(left_depth, right_depth)
+
+    for tree in trees:
+        root, depth = walk(json.loads(tree), 0)
+        builder.roots.append(root)
+        builder.depth = max(builder.depth, depth)
+    return builder.build(base=_xgboost_base_score(booster), float32_inputs=True)
+
+def compile_ensemble(model):
+    """Flatten a fitted tree ensemble (optionally the only step of a Pipeline).
+
+    Returns None for anything that is not a supported regressor, so callers can keep
+    using model.predict.
+    """
+    # sklearn is only needed to compile; workers that just map exported arrays never import it
+    from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(model, Pipeline):
+        if len(model.steps) != 1:
+            return None
+        model = model.steps[-1][1]
+
+    compiled = None
+    try:
+        if isinstance(model, (GradientBoostingRegressor, RandomForestRegressor, ExtraTreesRegressor)):
+            compiled = _compile_sklearn(model)
+        elif type(model).__module__.startswith("lightgbm"):
+            compiled = _compile_lightgbm(model)
+        elif type(model).__module__.startswith("xgboost"):
+            compiled = _compile_xgboost(model)
+    except (AttributeError, KeyError, ValueError) as e:
+        log.warning("Could not compile %s: %s", type(model).__name__, e)
+    if compiled is not None:
+        compiled.n_features = int(model.n_features_in_)
+    return compiled
+
+def _probe(n_features):
+    rng = np.random.default_rng(0)
+    return np.vstack([np.zeros(n_features), rng.normal(0.0, 100.0, size=(15, n_features))])
+
+def _agrees(actual, expected) -> bool:
+    return np.allclose(actual, expected, rtol=1e-5, atol=1e-3)
+
+def export_compiled(model, path: str, extra_models=()):
+    """Compile model and write its arrays to path if it scores like the original.
+
+    With extra_models (fitted on the same features) the ensembles are stacked, so one walk
+    scores the main model as output 0 and each extra model as the next output.
+    The arrays are written to a temporary sibling and renamed into place, so concurrent
+    exporters (several workers starting at once) leave exactly one complete copy.
+    Returns the compiled ensemble, or None if any model cannot be compiled.
+    """
+    models = [model, *extra_models]
+    members = [compile_ensemble(m) for m in models]
+    if any(member is None for member in members):
+        return None
+    compiled = members[0] if len(members) == 1 else CompiledEnsemble.stack(members)
+
+    probe = _probe(model.n_features_in_)
+    expected = np.column_stack([m.predict(probe) for m in models])
+    actual = compiled.predict(probe).reshape(len(probe), -1)
+    first = compiled.predict(probe[:1]).reshape(1, -1)
+    if not (_agrees(actual, expected) and _agrees(first, expected[:1])):
+        log.warning("Compiled %s disagrees with predict(), not exporting it", type(model).__name__)
+        return None
+
+    staging = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    compiled.save(staging)
+    try:
+        os.rename(staging, path)
+    except OSError:
+        # another process exported the same model first
+        shutil.rmtree(staging, ignore_errors=True)
+    return compiled
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threadpoolctl import threadpool_limits
+
+# estimator params that start their own thread pools inside predict
+INTRA_OP_THREAD_PARAMS = ("n_jobs", "nthread", "num_threads", "thread_count")
+
+class InferenceQueueFull(Exception):
+    pass
+
+def pin_single_thread(model):
+    """Set every per-estimator thread-count param in a fitted model (or Pipeline) to 1."""
+    steps = [step for _, step in model.steps] if hasattr(model, "steps") else [model]
+    for step in steps:
+        params = step.get_params(deep=False)
+        pinned = {p: 1 for p in INTRA_OP_THREAD_PARAMS if p in params}
+        if pinned:
+            step.set_params(**pinned)
+    return model
+
+def _limit_worker_threads():
+    # OpenMP and BLAS pools are sized per calling thread, so cap them inside each worker
+    threadpool_limits(limits=1)
+
+class InferenceExecutor:
+    """A fixed pool of inference threads with a bounded backlog.
+
+    Each worker runs one predict at a time with intra-op threading capped at 1, so the
+    pool size is the whole CPU budget for inference instead of workers x OpenMP threads.
+    """
+
+    def __init__(self, workers=None, max_queue=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="inference", initializer=_limit_worker_threads
+        )
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def _call(self, submitted, fn, args):
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_seconds += started - submitted
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.run_seconds += time.perf_counter() - started
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise InferenceQueueFull(f"Inference backlog is full ({self.queued} calls waiting)")
+            self.queued += 1
+        future = self._pool.submit(self._call, time.perf_counter(), fn, args)
+        future.add_done_callback(self._forget_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _forget_cancelled(self, future):
+        # a call cancelled before a worker picked it up never leaves the queue by itself
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "mean_wait_ms": round(self.wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                "mean_run_ms": round(self.run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,317 @@
+import joblib
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from inference.compiled_ensemble import CompiledEnsemble, export_compiled
+from inference.executor import pin_single_thread
+from inference.vectorizer import get_vectorizer
+from monitoring.log import get_logger
+from monitoring.metrics import STAGE_SECONDS
+
+MODELS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "models"))
+# published versions kept on disk besides the live one
+KEEP_VERSIONS = 3
+# above this many rows sklearn's Cython predict beats the NumPy tree walk
+COMPILED_MAX_BATCH = 64
+
+log = get_logger("models")
+
+class ModelUnavailable(Exception):
+    pass
+
+def model_path(name: str) -> str:
+    return os.path.join(MODELS_DIR, f"best_model_{name}.pkl")
+
+def feature_order_path(name: str) -> str:
+    return os.path.join(MODELS_DIR, f"{name}_feature_order.pkl")
+
+def versions_dir(name: str) -> str:
+    return os.path.join(MODELS_DIR, name)
+
+def current_pointer_path(name: str) -> str:
+    return os.path.join(versions_dir(name), "CURRENT")
+
+def legacy_trees_dir(name: str, version: str) -> str:
+    return os.path.join(MODELS_DIR, ".compiled", f"{name}-{version}")
+
+class ModelBundle:
+    """A trained model kept in memory together with the feature order it was fitted on.
+
+    When the model has compiled tree arrays, those serve every prediction and the pickled
+    pipeline is only unpickled (through model_loader) if something asks for `model`.
+    A bundle may also carry quantile models listed in metadata["quantile_outputs"]; their
+    trees are stacked after the main model's, so one walk scores all of them.
+    """
+
+    def __init__(self, name, model, feature_order, schema, version=None, metadata=None, compiled=None,
+                 model_loader=None, quantile_loader=None):
+        self.name = name
+        self._model = None
+        self._model_loader = model_loader
+        self._quantile_models = None
+        self._quantile_loader = quantile_loader
+        self._model_lock = threading.Lock()
+        if model is not None:
+            self._set_model(model)
+        self.compiled = compiled
+        self.feature_order = list(feature_order)
+        self.schema = schema
+        self.version = version
+        self.metadata = metadata or {}
+        self.quantile_outputs = list(self.metadata.get("quantile_outputs", []))
+        self.warmed_up = False
+
+        # feature name -> column in the model input matrix
+        self.feature_index = {f: i for i, f in enumerate(self.feature_order)}
+        self.vectorizer = get_vectorizer(schema, self.feature_order)
+        self._vectorize_seconds = STAGE_SECONDS.labels("vectorize", name)
+        self._predict_seconds = STAGE_SECONDS.labels("predict", name)
+
+    def _set_model(self, model):
+        # concurrency comes from the inference executor, not from threads inside one predict
+        self._model = pin_single_thread(model)
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._set_model(self._model_loader())
+        return self._model
+
+    @property
+    def quantile_models(self) -> dict:
+        if self._quantile_models is None:
+            with self._model_lock:
+                if self._quantile_models is None:
+                    models = self._quantile_loader() if self._quantile_loader else {}
+                    self._quantile_models = {q: pin_single_thread(m) for q, m in models.items()}
+        return self._quantile_models
+
+    def _use_compiled(self, X) -> bool:
+        # large batches only go to the pipeline if it is already in memory; unpickling it
+        # would give every worker a private copy of the trees
+        return self.compiled is not None and (len(X) <= COMPILED_MAX_BATCH or self._model is None)
+
+    def vectorize(self, features_list) -> np.ndarray:
+        started = time.perf_counter()
+        if len(features_list) == 1:
+            X = self.vectorizer.transform_one(features_list[0])
+        else:
+            X = self.vectorizer.transform(features_list)
+        self._vectorize_seconds.observe(time.perf_counter() - started)
+        return X
+
+    def predict(self, X) -> np.ndarray:
+        started = time.perf_counter()
+        out = self._predict(X)
+        self._predict_seconds.observe(time.perf_counter() - started)
+        return out
+
+    def _predict(self, X) -> np.ndarray:
+        if self._use_compiled(X):
+            out = self.compiled.predict(X)
+            return out if out.ndim == 1 else out[:, 0]
+        return self.model.predict(X)
+
+    def predict_with_quantiles(self, X):
+        """Point predictions and an (n_rows, n_quantiles) array, or None if the bundle has no quantiles."""
+        started = time.perf_counter()
+        out = self._predict_with_quantiles(X)
+        self._predict_seconds.observe(time.perf_counter() - started)
+        return out
+
+    def _predict_with_quantiles(self, X):
+        if not self.quantile_outputs:
+            return self._predict(X), None
+        if self._use_compiled(X) and self.compiled.n_outputs == 1 + len(self.quantile_outputs):
+            out = self.compiled.predict(X)
+            return out[:, 0], out[:, 1:]
+        models = self.quantile_models
+        return self.model.predict(X), np.column_stack([models[q].predict(X) for q in self.quantile_outputs])
+
+    def warm_up(self):
+        # the first predict pays for lazy initialisation (and, for mapped arrays, page faults)
+        probe = np.zeros((2, len(self.feature_order)), dtype=np.float64)
+        probe[1] = 1.0
+        if self.compiled is not None:
+            self.compiled.predict(probe)
+            self.compiled.predict(probe[:1])
+        else:
+            self.model.predict(probe)
+        self.warmed_up = True
+
+    def status(self) -> dict:
+        return {
+            "version": self.version,
+            "warm": self.warmed_up,
+            "compiled": self.compiled is not None,
+            "pipeline_loaded": self._model is not None
+        }
+
+# name -> live bundle. Bundles are never mutated after publishing, so a caller that
+# reads registry[name] once keeps a consistent model for the rest of its request.
+registry = {}
+schemas = {}
+_refresh_lock = threading.Lock()
+
+def published_version(name: str):
+    """Version id the CURRENT pointer refers to, or the legacy file's mtime if nothing was published."""
+    try:
+        with open(current_pointer_path(name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        pass
+    path = model_path(name)
+    if os.path.exists(path) and os.path.exists(feature_order_path(name)):
+        return time.strftime("%Y%m%d%H%M%S", time.gmtime(os.path.getmtime(path)))
+    return None
+
+def _read_bundle(name: str, schema, version: str) -> ModelBundle:
+    version_dir = os.path.join(versions_dir(name), version)
+    model = None
+    if os.path.isdir(version_dir):
+        pkl_path = os.path.join(version_dir, "model.pkl")
+        feature_order = joblib.load(os.path.join(version_dir, "feature_order.pkl"))
+        with open(os.path.join(version_dir, "metadata.json")) as f:
+            metadata = json.load(f)
+        trees_dir = os.path.join(version_dir, "trees")
+        quantiles_path = os.path.join(version_dir, "quantiles.pkl")
+    else:
+        pkl_path = model_path(name)
+        feature_order = joblib.load(feature_order_path(name))
+        metadata = {}
+        quantiles_path = None
+        trees_dir = legacy_trees_dir(name, version)
+        if not os.path.isdir(trees_dir):
+            # the first worker to load an unpublished model exports its arrays for the rest
+            model = joblib.load(pkl_path)
+            os.makedirs(os.path.dirname(trees_dir), exist_ok=True)
+            export_compiled(model, trees_dir)
+
+    compiled = CompiledEnsemble.load(trees_dir) if os.path.isdir(trees_dir) else None
+    return ModelBundle(
+        name, model, feature_order, schema, version=version, metadata=metadata,
+        compiled=compiled, model_loader=lambda: joblib.load(pkl_path),
+        quantile_loader=lambda: joblib.load(quantiles_path) if quantiles_path and os.path.exists(quantiles_path) else {}
+    )
+
+def refresh_bundle(name: str):
+    """Load the published version if it differs from the live one, warm it up, then swap it in."""
+    schema = schemas.get(name)
+    if schema is None:
+        return None
+
+    with _refresh_lock:
+        live = registry.get(name)
+        version = published_version(name)
+        if version is None or (live is not None and live.version == version):
+            return live
+
+        bundle = _read_bundle(name, schema, version)
+        if live is not None:
+            bundle.warm_up()
+        registry[name] = bundle
+        log.info("Model '%s' now serving version %s", name, version)
+        return bundle
+
+def register_model(name: str, schema):
+    """Declare a servable model without loading it; it is loaded on first use or by warm_up_models."""
+    schemas[name] = schema
+
+def get_bundle(name: str) -> ModelBundle:
+    bundle = registry.get(name)
+    if bundle is None:
+        bundle = refresh_bundle(name)
+        if bundle is None:
+            raise ModelUnavailable(f"No trained '{name}' model is available")
+    return bundle
+
+def load_bundle(name: str, schema) -> ModelBundle:
+    register_model(name, schema)
+    return get_bundle(name)
+
+def warm_up_models():
+    for name in list(schemas):
+        try:
+            bundle = get_bundle(name)
+            if not bundle.warmed_up:
+                bundle.warm_up()
+        except ModelUnavailable as e:
+            log.info("%s, skipping warm-up", e)
+        except Exception as e:
+            log.exception("Failed to load model '%s': %s", name, e)
+
+def publish_bundle(name: str, model, feature_order, metadata=None, quantile_models=None) -> str:
+    """Write a new model version next to the live ones and point CURRENT at it.
+
+    quantile_models maps an output name (e.g. "p90") to a model fitted on the same
+    features; they are saved with the main model and compiled into the same trees.
+
+    The version directory is complete before the pointer moves, and the pointer is
+    replaced with a rename, so a reader sees either the old version or the new one.
+    Returns the path of the published model file.
+    """
+    version = time.strftime("%Y%m%d%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+    root = versions_dir(name)
+    staging_dir = os.path.join(root, f".{version}.tmp")
+    version_dir = os.path.join(root, version)
+    os.makedirs(staging_dir)
+
+    try:
+        joblib.dump(model, os.path.join(staging_dir, "model.pkl"))
+        joblib.dump(list(feature_order), os.path.join(staging_dir, "feature_order.pkl"))
+        quantile_models = dict(quantile_models or {})
+        if quantile_models:
+            joblib.dump(quantile_models, os.path.join(staging_dir, "quantiles.pkl"))
+        export_compiled(model, os.path.join(staging_dir, "trees"), extra_models=list(quantile_models.values()))
+        with open(os.path.join(staging_dir, "metadata.json"), "w") as f:
+            json.dump({
+                **(metadata or {}),
+                "quantile_outputs": list(quantile_models),
+                "name": name,
+                "version": version,
+                "feature_count": len(feature_order),
+                "published_at": time.time()
+            }, f, default=str)
+        os.rename(staging_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+    pointer = current_pointer_path(name)
+    # a temp file of its own, so concurrent publishers (pool jobs, server workers) never
+    # write into each other's pointer before the replace
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(pointer), prefix=".CURRENT.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, pointer)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+    _prune_versions(name, keep=version)
+    return os.path.join(version_dir, "model.pkl")
+
+def _prune_versions(name: str, keep: str):
+    root = versions_dir(name)
+    old = sorted(
+        (v for v in os.listdir(root)
+         if v != keep and not v.startswith(".") and os.path.isdir(os.path.join(root, v))),
+        key=lambda v: os.path.getmtime(os.path.join(root, v))
+    )
+    for version in old[:max(0, len(old) - KEEP_VERSIONS)]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
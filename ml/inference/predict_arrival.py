@@ -1,29 +1,42 @@
-import joblib
 import numpy as np
-import os
+from typing import List
+from inference.model_bundle import get_bundle, register_model
+from inference.result_cache import cached_predict, register_cache
+from monitoring.log import get_logger, log_event
 from schemas.arrival_features import ArrivalFeatures
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "best_model_arrival.pkl")
-model = joblib.load(MODEL_PATH)
+register_model("arrival", ArrivalFeatures)
+log = get_logger("arrival")
+cache = register_cache("arrival", quantization={
+    "time_since_last_report_s": 1.0,
+    "time_since_first_report_s": 1.0,
+    "time_since_last_arrival_s": 5.0,
+    "t_mean": 1.0,
+})
+
+def _clip(predictions) -> list:
+    return np.clip(predictions, 0.0, 1.0).tolist()
+
+def _score(bundle, X) -> list:
+    return _clip(bundle.predict(X))
+
+def _log_predictions(features_list, probs):
+    for features, prob in zip(features_list, probs):
+        log_event(log, "predict-arrival", "Arrival prediction", bus_id=features.bus_id, stop_id=features.stop_id, probability=prob)
 
 def predict_arrival(features: ArrivalFeatures) -> float:
-    feature_order_path = os.path.join(os.path.dirname(__file__), "..", "models", "arrival_feature_order.pkl")
-    feature_order = joblib.load(feature_order_path)
-    
-    feature_dict = features.dict()
-    
-    feature_values = []
-    for f in feature_order:
-        value = feature_dict.get(f, 0)
-        if value is None:
-            value = 0
-        feature_values.append(value)
-    
-    X = np.array([feature_values], dtype=np.float64)
-    
-    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
-    
-    prob = model.predict(X)[0]
-    print("Probability:", prob)
-    
-    return float(np.clip(prob, 0.0, 1.0))
\ No newline at end of file
+    bundle = get_bundle("arrival")
+    X = bundle.vectorize([features])
+
+    prob = cached_predict(cache, bundle, X, lambda X_missing: _score(bundle, X_missing))[0]
+    _log_predictions([features], [prob])
+
+    return float(prob)
+
+def predict_arrival_batch(features_list: List[ArrivalFeatures]) -> np.ndarray:
+    bundle = get_bundle("arrival")
+    X = bundle.vectorize(features_list)
+
+    probs = cached_predict(cache, bundle, X, lambda X_missing: _score(bundle, X_missing))
+    _log_predictions(features_list, probs)
+    return np.array(probs)
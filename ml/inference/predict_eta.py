@@ -1,28 +1,53 @@
-import joblib
 import numpy as np
-import os
+from typing import List
+from inference.model_bundle import get_bundle, register_model
+from inference.result_cache import cached_predict, register_cache
+from inference.trip_features import build_trip_features
 from schemas.eta_features import ETAFeatures
-
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "best_model_eta.pkl")
-model = joblib.load(MODEL_PATH)
+from schemas.trip_eta import TripETARequest
+
+register_model("eta", ETAFeatures)
+# timing fields that tick every request; a step of a few seconds barely moves the delay
+cache = register_cache("eta", quantization={
+    "scheduled_arrival_time": 5000.0,
+    "seconds_until_scheduled": 5.0,
+    "minutes_since_last_checkpoint": 0.1,
+    "time_to_next_expected_report": 5.0,
+    "time_since_last_stop": 5.0,
+    "minutes_into_rush_hour": 0.5,
+    "checkpoint_freshness_score": 0.01,
+})
+
+def _clip(bundle, delays, quantiles) -> list:
+    delays = np.clip(delays, -3600.0, 7200.0)
+    if quantiles is None:
+        return [(delay, None) for delay in delays.tolist()]
+
+    # independently fitted quantiles can cross; sorting each row restores p10 <= p50 <= p90
+    quantiles = np.clip(np.sort(quantiles, axis=1), -3600.0, 7200.0)
+    names = bundle.quantile_outputs
+    return [(delay, dict(zip(names, row))) for delay, row in zip(delays.tolist(), quantiles.tolist())]
+
+def _score(bundle, X) -> list:
+    return _clip(bundle, *bundle.predict_with_quantiles(X))
+
+def predict_eta_with_quantiles_batch(features_list: List[ETAFeatures]) -> list:
+    """(delay, {quantile name: delay} or None) per row, scored in one pass over all the trees."""
+    bundle = get_bundle("eta")
+    X = bundle.vectorize(features_list)
+
+    return cached_predict(cache, bundle, X, lambda X_missing: _score(bundle, X_missing))
 
 def predict_eta(features: ETAFeatures) -> float:
-    feature_order_path = os.path.join(os.path.dirname(__file__), "..", "models", "eta_feature_order.pkl")
-    feature_order = joblib.load(feature_order_path)
-
-    feature_dict = features.dict()
-
-    feature_values = []
-    for f in feature_order:
-        value = feature_dict.get(f, 0)
-        if value is None:
-            value = 0
-        feature_values.append(value)
-
-    X = np.array([feature_values], dtype=np.float64)
+    return float(predict_eta_with_quantiles_batch([features])[0][0])
 
-    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+def predict_eta_batch(features_list: List[ETAFeatures]) -> np.ndarray:
+    return np.array([delay for delay, _ in predict_eta_with_quantiles_batch(features_list)])
 
-    delay = model.predict(X)[0]
+def predict_trip_eta(request: TripETARequest):
+    """Scores every downstream stop of a trip in one batch; returns (predictions, base travel times, template)."""
+    bundle = get_bundle("eta")
+    X, base_travel_time, template = build_trip_features(bundle, request)
 
-    return float(np.clip(delay, -3600.0, 7200.0))
\ No newline at end of file
+    predictions = cached_predict(cache, bundle, X, lambda X_missing: _score(bundle, X_missing))
+    return predictions, base_travel_time.tolist(), template
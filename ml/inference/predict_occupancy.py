@@ -1,26 +1,22 @@
-import joblib
 import numpy as np
-import os
+from inference.model_bundle import register_model, registry
+from inference.result_cache import cached_predict, register_cache
+from monitoring.metrics import counter
 from schemas.occupancy_features import OccupancyFeatures
 
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "best_model_occupancy.pkl")
-FEATURE_ORDER_PATH = os.path.join(os.path.dirname(__file__), "..", "models", "occupancy_feature_order.pkl")
-
-model = None
-feature_order = None
-
-def load_model():
-    global model, feature_order
-    if os.path.exists(MODEL_PATH) and os.path.exists(FEATURE_ORDER_PATH):
-        model = joblib.load(MODEL_PATH)
-        feature_order = joblib.load(FEATURE_ORDER_PATH)
-    else:
-        print("Occupancy model not found. Predictions will use fallback.")
-
-load_model()
+# loaded by the startup warm-up; until a model exists predictions use the fallback
+register_model("occupancy", OccupancyFeatures)
+cache = register_cache("occupancy", quantization={
+    "time_since_last_report_s": 1.0,
+    "time_since_first_report_s": 1.0,
+    "t_mean": 1.0,
+})
+fallbacks = counter("ml_occupancy_fallback_total", "Occupancy predictions answered by the heuristic because no model is loaded")
 
 def predict_occupancy(features: OccupancyFeatures) -> dict:
-    if model is None or feature_order is None:
+    bundle = registry.get("occupancy")
+    if bundle is None:
+        fallbacks.inc()
         reported = features.occupancy_level_reported
         historical = features.historical_avg_occupancy
         
@@ -39,19 +35,12 @@ def predict_occupancy(features: OccupancyFeatures) -> dict:
             "method": "fallback"
         }
     
-    feature_dict = features.dict()
+    X = bundle.vectorize([features])
     
-    feature_values = []
-    for f in feature_order:
-        value = feature_dict.get(f, 0)
-        if value is None:
-            value = 0
-        feature_values.append(value)
-    
-    X = np.array([feature_values], dtype=np.float64)
-    X = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
-    
-    prediction = model.predict(X)[0]
+    prediction = cached_predict(cache, bundle, X, lambda X_missing: bundle.predict(X_missing).tolist())[0]
+    return _result(features, prediction)
+
+def _result(features: OccupancyFeatures, prediction: float) -> dict:
     predicted_level = int(max(1, min(5, round(prediction))))
     
     if features.report_count > 0 and features.occupancy_level_reported > 0:
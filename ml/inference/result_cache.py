@@ -0,0 +1,167 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from monitoring.metrics import register_collector
+
+RESULT_CACHE_MAX_BYTES = int(float(os.environ.get("RESULT_CACHE_MAX_MB", "16")) * 2**20)
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "10"))
+# OrderedDict link, entry tuple and key object on top of the key and value payloads
+ENTRY_OVERHEAD = 200
+
+MISS = object()
+
+def _approx_size(value) -> int:
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_size(k) + _approx_size(v) for k, v in value.items())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+class ResultCache:
+    """LRU cache of per-row model outputs, keyed by the quantized feature vector.
+
+    quantization maps a feature name to a step; those columns are rounded to the nearest
+    multiple of the step before hashing, so rows that differ only by a few seconds of
+    timing share an entry. Entries expire after ttl seconds, the least recently used are
+    evicted once the estimated size passes max_bytes, and the whole cache is dropped as
+    soon as it sees a bundle version other than the one its entries were computed with.
+    """
+
+    def __init__(self, name, quantization=None, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.name = name
+        self.quantization = dict(quantization or {})
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._steps = {}
+        self.version = None
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _steps_for(self, feature_order):
+        key = tuple(feature_order)
+        steps = self._steps.get(key)
+        if steps is None:
+            columns = [i for i, f in enumerate(feature_order) if self.quantization.get(f)]
+            steps = (np.array(columns, dtype=np.intp), np.array([self.quantization[feature_order[i]] for i in columns]))
+            self._steps[key] = steps
+        return steps
+
+    def keys(self, bundle, X) -> list:
+        columns, steps = self._steps_for(bundle.feature_order)
+        Q = np.array(X, dtype=np.float64)
+        if len(columns):
+            Q[:, columns] = np.round(Q[:, columns] / steps)
+        # -0.0 and 0.0 hash differently but mean the same feature value
+        Q += 0.0
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in Q]
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get_many(self, version, keys) -> list:
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            self._check_version(version)
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    results.append(MISS)
+                elif entry[0] < now:
+                    self._remove(key)
+                    self.expired += 1
+                    self.misses += 1
+                    results.append(MISS)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[1])
+        return results
+
+    def put_many(self, version, keys, values):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._check_version(version)
+            for key, value in zip(keys, values):
+                if key in self._entries:
+                    self._remove(key)
+                size = ENTRY_OVERHEAD + len(key) + _approx_size(value)
+                self._entries[key] = (expires, value, size)
+                self.bytes += size
+            while self.bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "quantized_features": sorted(self.quantization),
+            }
+
+# name -> cache, read by the stats endpoint
+caches = {}
+
+def register_cache(name, quantization=None) -> ResultCache:
+    cache = caches[name] = ResultCache(name, quantization)
+    return cache
+
+def _collect() -> list:
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    return [
+        (f"ml_cache_{key}_total", "counter", f"Result cache {key}", [("", {"cache": name}, s[key]) for name, s in stats.items()])
+        for key in ("hits", "misses", "expired", "evictions", "invalidations")
+    ] + [
+        ("ml_cache_entries", "gauge", "Entries held by the result cache", [("", {"cache": name}, s["entries"]) for name, s in stats.items()]),
+    ]
+
+register_collector(_collect)
+
+def cached_predict(cache, bundle, X, predict) -> list:
+    """Per-row results for X, calling predict(X_missing) -> sequence only for rows not in the cache."""
+    keys = cache.keys(bundle, X)
+    results = cache.get_many(bundle.version, keys)
+    missing = [i for i, result in enumerate(results) if result is MISS]
+    if missing:
+        fresh = predict(X[missing])
+        for i, value in zip(missing, fresh):
+            results[i] = value
+        cache.put_many(bundle.version, [keys[i] for i in missing], fresh)
+    return results
@@ -0,0 +1,132 @@
+import math
+import time
+import numpy as np
+from schemas.eta_features import ETAFeatures
+
+# assumed segment length when the caller has no distances, as in the Node feature builder
+DEFAULT_SEGMENT_KM = 0.5
+
+def _time_features(now_ms: float) -> dict:
+    t = time.localtime(now_ms / 1000)
+    hour, day_of_week = t.tm_hour, (t.tm_wday + 1) % 7
+    is_weekend = day_of_week in (0, 6)
+    if 7 <= hour < 10:
+        minutes_into_rush_hour = (hour - 7) * 60 + t.tm_min
+    elif 17 <= hour < 20:
+        minutes_into_rush_hour = (hour - 17) * 60 + t.tm_min
+    else:
+        minutes_into_rush_hour = 0
+    return {
+        "hour_of_day": hour,
+        "day_of_week": day_of_week,
+        "is_weekend": int(is_weekend),
+        "is_rush_hour": int(7 <= hour < 10 or 17 <= hour < 20),
+        "is_peak_period": int(7 <= hour < 20 and not is_weekend),
+        "minutes_into_rush_hour": minutes_into_rush_hour,
+    }
+
+def _checkpoint_features(now_ms: float, checkpoint_ms: float) -> dict:
+    minutes = max(0.0, (now_ms - checkpoint_ms) / 60000)
+    freshness = math.exp(-minutes / 20)
+    return {
+        "minutes_since_last_checkpoint": minutes,
+        "checkpoint_freshness_score": freshness,
+        "checkpoint_age_penalty": 1 + minutes / 10,
+        "has_recent_checkpoint": int(minutes < 10),
+        "checkpoint_reliability_score": freshness,
+        "time_since_last_stop": minutes * 60,
+    }
+
+def build_trip_features(bundle, request):
+    """Feature rows for every downstream stop of one trip, in bundle feature order.
+
+    Target j covers segments 0..j, so the remaining-route aggregates the Node builder
+    recomputes per stop are prefix sums, prefix min/max and prefix moments over the same
+    segment list. Returns the (n_stops, n_features) matrix, the base travel time per stop
+    and the shared template row as ETAFeatures.
+    """
+    now = request.prediction_made_at
+    times = np.asarray(request.segment_times, dtype=np.float64)
+    n = len(times)
+    counts = np.arange(1, n + 1, dtype=np.float64)
+    distances = (
+        np.full(n, DEFAULT_SEGMENT_KM) if request.segment_distances_km is None
+        else np.asarray(request.segment_distances_km, dtype=np.float64)
+    )
+
+    unknown = set(request.features) - set(ETAFeatures.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+    shared = dict(request.features)
+    if request.last_checkpoint_at is not None:
+        shared.update(_checkpoint_features(now, request.last_checkpoint_at))
+    for name, value in _time_features(now).items():
+        shared.setdefault(name, value)
+    template = ETAFeatures(**{
+        **shared,
+        "bus_id": request.bus_id,
+        "route_id": request.route_id,
+        "trip_id": request.trip_id,
+        "target_stop_id": request.stop_ids[0],
+        "prediction_made_at": now,
+        "stops_remaining": 1,
+    })
+
+    total = np.cumsum(times)
+    mean = total / counts
+    # moments around the first segment keep E[x^2] - E[x]^2 from cancelling
+    shifted = times - times[0]
+    variance = np.maximum(np.cumsum(shifted ** 2) / counts - (np.cumsum(shifted) / counts) ** 2, 0.0)
+    columns = {
+        "stops_remaining": counts,
+        "remaining_segment_count": counts,
+        "total_segment_time_remaining": total,
+        "avg_segment_time_remaining": mean,
+        "segment_time_avg": mean,
+        "stddev_segment_time": np.sqrt(variance),
+        "segment_time_variance": variance,
+        "min_segment_time": np.minimum.accumulate(times),
+        "max_segment_time": np.maximum.accumulate(times),
+        "distance_remaining_km": np.cumsum(distances),
+        "distance_to_target": np.cumsum(distances),
+    }
+
+    if request.scheduled_arrival_times is not None:
+        scheduled = np.array([np.nan if t is None else t for t in request.scheduled_arrival_times], dtype=np.float64)
+        columns["scheduled_arrival_time"] = np.nan_to_num(scheduled)
+        columns["seconds_until_scheduled"] = np.nan_to_num((scheduled - now) / 1000)
+
+    base_travel_time = total
+    if request.last_checkpoint_at is not None:
+        since = shared["time_since_last_stop"]
+        minutes = shared["minutes_since_last_checkpoint"]
+        # stops are inferred passed while the elapsed time exceeds 3x the time to reach them;
+        # the prefix is shared, so each target just caps the trip-wide count at its own index
+        passed = since > total * 3
+        passed_all = n if passed.all() else int(np.argmin(passed))
+        passed_count = np.minimum(passed_all, counts)
+        consumed = np.where(passed_count > 0, total[np.maximum(passed_count.astype(np.intp) - 1, 0)], 0.0)
+        base_travel_time = np.maximum(0.0, (total - consumed) - (since - consumed))
+
+        average_minutes = mean / 60
+        columns["inferred_passed_count"] = passed_count
+        columns["inferred_time_consumed"] = consumed
+        columns["stops_since_last_checkpoint"] = np.floor(
+            minutes / np.where(average_minutes > 0, average_minutes, 5.0)
+        )
+        columns["time_to_next_expected_report"] = np.maximum(0.0, mean - since)
+    columns["base_travel_time"] = base_travel_time
+
+    unknown = set(request.stop_features) - set(bundle.feature_index)
+    if unknown:
+        raise ValueError(f"Unknown per-stop features: {', '.join(sorted(unknown))}")
+    for name, values in request.stop_features.items():
+        columns[name] = np.asarray(values, dtype=np.float64)
+    base_travel_time = columns["base_travel_time"]
+
+    X = np.repeat(bundle.vectorize([template]), n, axis=0)
+    for name, values in columns.items():
+        column = bundle.feature_index.get(name)
+        if column is not None:
+            X[:, column] = values
+    return X, base_travel_time, template
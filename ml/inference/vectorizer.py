@@ -0,0 +1,82 @@
+import math
+import threading
+import typing
+import numpy as np
+
+_VECTORIZERS = {}
+_VECTORIZERS_LOCK = threading.Lock()
+
+def _accepts_none(field) -> bool:
+    return type(None) in typing.get_args(field.annotation)
+
+def _compile_values(schema, feature_order):
+    # Builds `def values(obj): return (obj.a, (0.0 if (v := obj.b) is None else v), 0.0, ...)`
+    # so a whole row comes out of one call with no intermediate dict or list.
+    fields = schema.model_fields
+    parts = []
+    for name in feature_order:
+        field = fields.get(name)
+        if field is None:
+            parts.append("0.0")
+            continue
+        access = f"obj.{name}" if name.isidentifier() else f"getattr(obj, {name!r})"
+        if _accepts_none(field):
+            parts.append(f"(0.0 if (v := {access}) is None else v)")
+        else:
+            parts.append(access)
+
+    src = f"def values(obj):\n    return ({', '.join(parts)},)\n"
+    namespace = {}
+    exec(compile(src, f"<vectorizer {schema.__name__}>", "exec"), namespace)
+    return namespace["values"]
+
+class FeatureVectorizer:
+    """Writes schema instances straight into float64 rows in model feature order.
+
+    Buffers handed out without an explicit `out` are reused per thread and stay
+    valid until the next call on that thread.
+    """
+
+    def __init__(self, schema, feature_order):
+        self.schema = schema
+        self.feature_order = list(feature_order)
+        self.n_features = len(self.feature_order)
+        self.values = _compile_values(schema, self.feature_order)
+        self._local = threading.local()
+
+    def _buffer(self, n_rows: int) -> np.ndarray:
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape[0] < n_rows:
+            capacity = max(n_rows, 2 * (buf.shape[0] if buf is not None else 8))
+            buf = np.empty((capacity, self.n_features), dtype=np.float64)
+            self._local.buf = buf
+        return buf[:n_rows]
+
+    def transform_one(self, features, out=None) -> np.ndarray:
+        X = self._buffer(1) if out is None else out
+        X[0] = self.values(features)
+        return _zero_non_finite(X)
+
+    def transform(self, features_list, out=None) -> np.ndarray:
+        X = self._buffer(len(features_list)) if out is None else out[:len(features_list)]
+        values = self.values
+        for i, features in enumerate(features_list):
+            X[i] = values(features)
+        return _zero_non_finite(X)
+
+def _zero_non_finite(X: np.ndarray) -> np.ndarray:
+    # the sum is only non-finite if some entry is, which keeps the common path cheap
+    if not math.isfinite(X.sum()):
+        np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return X
+
+def get_vectorizer(schema, feature_order) -> FeatureVectorizer:
+    key = (schema, tuple(feature_order))
+    vectorizer = _VECTORIZERS.get(key)
+    if vectorizer is None:
+        with _VECTORIZERS_LOCK:
+            vectorizer = _VECTORIZERS.get(key)
+            if vectorizer is None:
+                vectorizer = FeatureVectorizer(schema, feature_order)
+                _VECTORIZERS[key] = vectorizer
+    return vectorizer
@@ -0,0 +1,176 @@
+import csv
+import io
+import os
+import threading
+import time
+from typing import Optional
+from pydantic import create_model
+from monitoring.log import get_logger
+from monitoring.metrics import STAGE_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; appends are then only safe within one process
+    fcntl = None
+
+log = get_logger("ingestion")
+
+class IngestionQueueFull(Exception):
+    pass
+
+class DatasetWriter:
+    """Queues validated rows in memory and appends them to one CSV file in batches.
+
+    A single background thread per dataset owns the file. Each batch is written
+    with one O_APPEND write under an exclusive lock, so rows from several
+    workers never interleave mid-line.
+    """
+
+    def __init__(self, name, path, schema, target=None, target_aliases=None, max_batch=500, flush_interval=2.0, max_pending=20000):
+        self.name = name
+        self.path = path
+        self.schema = schema
+        self.target = target
+        # other body fields the target may arrive as, e.g. the Node client's "label";
+        # alias -> None to copy the value, or fn(row, value) to convert it
+        self.target_aliases = dict(target_aliases or {}) if target else {}
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._flush_seconds = STAGE_SECONDS.labels("flush", name)
+
+        # the feature model plus the target and its aliases, so a posted row is validated in one pass
+        target_fields = [target, *self.target_aliases] if target else []
+        self.row_schema = create_model(
+            f"{schema.__name__}Row", __base__=schema, **{field: (Optional[float], None) for field in target_fields}
+        )
+        self.default_columns = list(schema.model_fields) + ([target] if target else [])
+        self._columns = None
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.flushes = 0
+        self.last_flush_at = None
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, validated, raw: dict = None) -> int:
+        """Queue one row; validated is a schema or row_schema instance, raw supplies the target (or an alias) for the former."""
+        row = validated.model_dump()
+        if raw is not None:
+            for field in [self.target, *self.target_aliases] if self.target else []:
+                row[field] = raw.get(field)
+        for alias, convert in self.target_aliases.items():
+            value = row.pop(alias, None)
+            if row[self.target] is None and value is not None:
+                row[self.target] = convert(row, value) if convert else value
+
+        with self._lock:
+            if self._closed or len(self._pending) >= self.max_pending:
+                self.rows_rejected += 1
+                raise IngestionQueueFull(f"{self.name} ingestion queue is full ({len(self._pending)} rows pending)")
+            self._pending.append(row)
+            pending = len(self._pending)
+
+        if pending >= self.max_batch:
+            self._wakeup.set()
+        return pending
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "max_pending": self.max_pending,
+            "utilization": round(pending / self.max_pending, 4),
+            "rows_written": self.rows_written,
+            "rows_rejected": self.rows_rejected,
+            "flushes": self.flushes,
+            "last_flush_at": self.last_flush_at,
+            "last_error": self.last_error,
+        }
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            self._append(rows)
+        except Exception as e:
+            # _append rolled back whatever it wrote; put the batch back in front so it is
+            # retried on the next flush
+            with self._lock:
+                self._pending = rows + self._pending
+            self.last_error = str(e)
+            log.warning("Error flushing %s data: %s", self.name, e)
+            return 0
+
+        self._flush_seconds.observe(time.perf_counter() - started)
+        self.rows_written += len(rows)
+        self.flushes += 1
+        self.last_flush_at = time.time()
+        self.last_error = None
+        return len(rows)
+
+    def close(self, timeout=10.0):
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _append(self, rows):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+
+            header = None
+            if os.fstat(fd).st_size == 0:
+                header = self._columns = self.default_columns
+            elif self._columns is None:
+                self._columns = self._read_header()
+
+            buf = io.StringIO()
+            writer = csv.writer(buf, lineterminator="\n")
+            if header:
+                writer.writerow(header)
+            columns = self._columns
+            writer.writerows([row.get(c) for c in columns] for row in rows)
+
+            data = buf.getvalue().encode("utf-8")
+            # the lock keeps other writers out, so everything past start is this batch
+            start = os.fstat(fd).st_size
+            try:
+                while data:
+                    written = os.write(fd, data)
+                    data = data[written:]
+            except BaseException:
+                os.ftruncate(fd, start)
+                raise
+        finally:
+            os.close(fd)
+
+    def _read_header(self):
+        # follow the column layout of an existing file (e.g. one written by the data generators)
+        with open(self.path, newline="") as f:
+            header = next(csv.reader(f), None)
+        return header or self.default_columns
@@ -0,0 +1,259 @@
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from monitoring.log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; jobs are then only serialized within one server worker
+    fcntl = None
+
+# job kind -> (module, function) run inside the worker process
+TRAINERS = {
+    "arrival": ("training.train_arrival", "train_arrival_models"),
+    "eta": ("training.train_eta", "train_eta_models"),
+    "occupancy": ("training.train_occupancy", "train_occupancy_models"),
+}
+
+ACTIVE_STATES = ("queued", "running")
+
+log = get_logger("jobs")
+
+def _lower_priority():
+    # keep training from starving the serving process of CPU
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock shared by every process that opens `path`; released if the holder dies."""
+    if fcntl is None or path is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _pid_alive(pid):
+    if not pid or pid < 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _run_job(job_id, kind, kwargs, events, lock_path=None):
+    module_name, fn_name = TRAINERS[kind]
+    # each server worker has its own pool; the lock lets one job train at a time across all of them
+    with _file_lock(lock_path):
+        events.put((job_id, {"stage": "started"}))
+        trainer = getattr(importlib.import_module(module_name), fn_name)
+        return trainer(progress=lambda event: events.put((job_id, event)), **kwargs)
+
+class TrainingJobManager:
+    """Runs training jobs in a process pool and keeps their status for polling.
+
+    With a state_dir every job record is also mirrored to <state_dir>/<id>.json, so a
+    poll that lands on another server worker still finds the job. The state_dir also holds
+    the lock files that dedupe submissions and run one training at a time across workers.
+    """
+
+    def __init__(self, max_workers=1, history=50, on_success=None, state_dir=None):
+        self.max_workers = max_workers
+        self.state_dir = state_dir
+        # called as on_success(kind, result) once a job's artifact is published
+        self.on_success = on_success
+        self.history = history
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._mp_manager = None
+        self._events = None
+        self._drain_thread = None
+
+    def _start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self._mp_manager = ctx.Manager()
+        self._events = self._mp_manager.Queue()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=ctx, initializer=_lower_priority
+        )
+        self._drain_thread = threading.Thread(target=self._drain, name="training-job-events", daemon=True)
+        self._drain_thread.start()
+
+    def submit(self, kind: str, **kwargs) -> dict:
+        if kind not in TRAINERS:
+            raise ValueError(f"Unknown training job '{kind}'")
+
+        with self._lock, _file_lock(self._lock_path("submit")):
+            for job in self.jobs.values():
+                if job["kind"] == kind and job["status"] in ACTIVE_STATES:
+                    return dict(job)
+            job = self._active_elsewhere(kind)
+            if job:
+                return job
+
+            if self._executor is None:
+                self._start()
+
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "owner_pid": os.getpid(),
+                "params": kwargs,
+                "status": "queued",
+                "stage": None,
+                "progress": 0.0,
+                "models": {},
+                "result": None,
+                "artifact_path": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self.jobs[job_id] = job
+            self._persist(job)
+            self._prune()
+
+            future = self._executor.submit(_run_job, job_id, kind, kwargs, self._events, self._lock_path("training"))
+            future.add_done_callback(lambda f, job_id=job_id: self._finish(job_id, f))
+            return dict(job)
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self._read_persisted(job_id)
+
+    def list(self):
+        with self._lock:
+            jobs = {job_id: dict(job) for job_id, job in self.jobs.items()}
+        if self.state_dir and os.path.isdir(self.state_dir):
+            for filename in os.listdir(self.state_dir):
+                job_id, ext = os.path.splitext(filename)
+                if ext == ".json" and job_id not in jobs:
+                    job = self._read_persisted(job_id)
+                    if job:
+                        jobs[job_id] = job
+        return sorted(jobs.values(), key=lambda j: j["submitted_at"])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
+
+    def _finish(self, job_id, future):
+        self._record_outcome(job_id, future)
+        job = self.get(job_id)
+        if job and job["status"] == "succeeded" and self.on_success:
+            try:
+                self.on_success(job["kind"], job["result"])
+            except Exception as e:
+                log.exception("Post-training hook failed for job %s: %s", job_id, e)
+
+    def _record_outcome(self, job_id, future):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job["finished_at"] = time.time()
+            if future.cancelled():
+                job["status"] = "cancelled"
+            elif future.exception() is not None:
+                error = future.exception()
+                job["status"] = "failed"
+                job["error"] = "".join(traceback.format_exception_only(type(error), error)).strip()
+            else:
+                result = future.result()
+                job["status"] = "succeeded"
+                job["progress"] = 1.0
+                job["result"] = result
+                job["artifact_path"] = (result or {}).get("model_path")
+            self._persist(job)
+
+    def _drain(self):
+        while True:
+            try:
+                job_id, event = self._events.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                stage = event.get("stage")
+                if stage == "started":
+                    job["status"] = "running"
+                    job["started_at"] = time.time()
+                else:
+                    job["stage"] = stage
+                    if "progress" in event:
+                        job["progress"] = event["progress"]
+                    if stage == "model_done":
+                        job["models"][event["model"]] = event["metrics"]
+                self._persist(job)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j["status"] not in ACTIVE_STATES]
+        for job in sorted(finished, key=lambda j: j["submitted_at"])[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job["id"]]
+            if self.state_dir:
+                try:
+                    os.remove(os.path.join(self.state_dir, f"{job['id']}.json"))
+                except FileNotFoundError:
+                    pass
+
+    def _lock_path(self, name):
+        return os.path.join(self.state_dir, f"{name}.lock") if self.state_dir else None
+
+    def _active_elsewhere(self, kind):
+        # a job of this kind queued or running in another server worker that is still alive
+        if not self.state_dir or not os.path.isdir(self.state_dir):
+            return None
+        for filename in os.listdir(self.state_dir):
+            job_id, ext = os.path.splitext(filename)
+            if ext != ".json" or job_id in self.jobs:
+                continue
+            job = self._read_persisted(job_id)
+            if (job and job["kind"] == kind and job["status"] in ACTIVE_STATES
+                    and _pid_alive(job.get("owner_pid"))):
+                return job
+        return None
+
+    def _persist(self, job):
+        if not self.state_dir:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = os.path.join(self.state_dir, f"{job['id']}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(job, f, default=str)
+        os.replace(path + ".tmp", path)
+
+    def _read_persisted(self, job_id):
+        if not self.state_dir or not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self.state_dir, f"{job_id}.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
@@ -1,93 +1,288 @@
-from fastapi import FastAPI
-from training.train_arrival import train_arrival_models
-from training.train_eta import train_eta_models
-from training.train_occupancy import train_occupancy_models
-from inference.predict_arrival import predict_arrival as predict_arrival_inference
-from inference.predict_eta import predict_eta as predict_eta_inference
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from inference.predict_arrival import predict_arrival_batch as predict_arrival_batch_inference
+from inference.predict_eta import predict_eta_with_quantiles_batch as predict_eta_batch_inference
+from inference.predict_eta import predict_trip_eta as predict_trip_eta_inference
 from inference.predict_occupancy import predict_occupancy as predict_occupancy_inference
+from inference.executor import InferenceExecutor, InferenceQueueFull
+from inference.batcher import BATCH_SIZE_BUCKETS, MicroBatcher
+from inference.result_cache import caches as result_caches
+from inference.model_bundle import registry as model_registry, schemas as model_schemas, refresh_bundle, warm_up_models, ModelUnavailable
+from ingestion.dataset_writer import IngestionQueueFull
+from jobs.training_jobs import TrainingJobManager
+from monitoring import metrics
+from monitoring.http_metrics import RequestMetricsMiddleware, TimedRoute
+from monitoring.log import get_logger, log_event, setup_logging, stop_logging
+from storage.parquet_dataset import ParquetDatasetWriter
 from pydantic import BaseModel
-import pandas as pd
+from typing import List, Literal
 from schemas.arrival_features import ArrivalFeatures
 from schemas.eta_features import ETAFeatures
 from schemas.occupancy_features import OccupancyFeatures
+from schemas.json_io import FastJSONResponse, JSONBody
+from schemas.trip_eta import TripETARequest
 
-app = FastAPI()
+setup_logging()
+log = get_logger("api")
+
+REQUIRED_MODELS = ("arrival", "eta")
+# how often to pick up versions published by another process (e.g. a CLI training run)
+MODEL_REFRESH_INTERVAL = 30.0
+# single-row predictions arriving within this window are scored in one call
+BATCH_MAX_WAIT = 0.002
+BATCH_MAX_SIZE = 64
+# uvicorn worker processes; the start commands export this variable so uvicorn and the
+# app agree on it. Cores are split between the workers
+SERVER_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# inference threads per process and how many calls may wait for one
+INFERENCE_WORKERS = max(1, (os.cpu_count() or 1) // SERVER_WORKERS)
+INFERENCE_MAX_QUEUE = 256
+
+# the Node client posts the arrival and occupancy targets as "label", and may send the ETA
+# target as the observed actual_eta_seconds instead of the delay
+writers = {
+    "arrival": ParquetDatasetWriter("arrival", "data/arrivals/dataset", ArrivalFeatures, target="confirm_prob",
+                                    target_aliases={"label": None}),
+    "eta": ParquetDatasetWriter("eta", "data/eta/dataset", ETAFeatures, target="delay_seconds",
+                                target_aliases={"actual_eta_seconds": lambda row, eta: eta - row["base_travel_time"]}),
+    "occupancy": ParquetDatasetWriter("occupancy", "data/occupancy/dataset", OccupancyFeatures, target="confirmed_occupancy_level",
+                                      target_aliases={"label": None}),
+}
+
+# hot endpoints validate these straight from the request bytes
+bodies = {
+    "arrival": JSONBody(ArrivalFeatures),
+    "eta": JSONBody(ETAFeatures),
+    "eta_batch": JSONBody(List[ETAFeatures]),
+    "trip_eta": JSONBody(TripETARequest),
+    "occupancy": JSONBody(OccupancyFeatures),
+}
+store_bodies = {name: JSONBody(writer.row_schema) for name, writer in writers.items()}
+
+inference_executor = InferenceExecutor(workers=INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE)
+
+batchers = {
+    "eta": MicroBatcher(
+        "eta", predict_eta_batch_inference,
+        max_wait=BATCH_MAX_WAIT, max_batch=BATCH_MAX_SIZE, run=inference_executor.run
+    ),
+    "arrival": MicroBatcher(
+        "arrival", lambda rows: predict_arrival_batch_inference(rows).tolist(),
+        max_wait=BATCH_MAX_WAIT, max_batch=BATCH_MAX_SIZE, run=inference_executor.run
+    ),
+}
+
+def batch_size_metrics():
+    samples = []
+    for name, batcher in batchers.items():
+        stats = batcher.stats()
+        counts = list(stats["batch_size_histogram"].values())
+        samples.extend(metrics.histogram_samples({"batcher": name}, BATCH_SIZE_BUCKETS, counts, stats["rows"]))
+    return [("ml_batch_size", "histogram", "Rows per micro-batch handed to the model", samples)]
+
+metrics.register_collector(batch_size_metrics)
+
+training_jobs = TrainingJobManager(
+    on_success=lambda kind, result: refresh_bundle(kind),
+    state_dir="data/jobs"
+)
+
+async def refresh_models_periodically():
+    while True:
+        await asyncio.sleep(MODEL_REFRESH_INTERVAL)
+        for name in list(model_schemas):
+            try:
+                await asyncio.to_thread(refresh_bundle, name)
+            except Exception as e:
+                log.warning("Failed to refresh model '%s': %s", name, e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # serve /healthz right away; /readyz turns green once the models are loaded and warm.
+    # /readyz is for the load balancer only: the Node clients gate on /healthz, since
+    # training, storing and occupancy (which has a fallback) must work without warm models
+    warm_up = asyncio.create_task(asyncio.to_thread(warm_up_models))
+    refresher = asyncio.create_task(refresh_models_periodically())
+    yield
+    warm_up.cancel()
+    refresher.cancel()
+    for batcher in batchers.values():
+        await batcher.close()
+    for writer in writers.values():
+        writer.close()
+    training_jobs.shutdown()
+    inference_executor.shutdown()
+    stop_logging()
+
+app = FastAPI(lifespan=lifespan)
+app.router.route_class = TimedRoute
+app.add_middleware(RequestMetricsMiddleware)
+
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request, exc: InferenceQueueFull):
+    return JSONResponse({"status": "busy", "message": str(exc)}, status_code=503)
+
+@app.exception_handler(ModelUnavailable)
+async def model_unavailable_handler(request, exc: ModelUnavailable):
+    return JSONResponse({"status": "unavailable", "message": str(exc)}, status_code=503)
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    models = {name: bundle.status() for name, bundle in model_registry.items()}
+    ready = all(name in models and models[name]["warm"] for name in REQUIRED_MODELS)
+    return JSONResponse(
+        {"ready": ready, "models": models},
+        status_code=200 if ready else 503
+    )
+
+@app.get("/inference/stats")
+async def inference_stats():
+    return inference_executor.stats()
+
+@app.get("/batching/stats")
+async def batching_stats():
+    return {name: batcher.stats() for name, batcher in batchers.items()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {name: cache.stats() for name, cache in result_caches.items()}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ingestion/stats")
+async def ingestion_stats():
+    return {name: writer.stats() for name, writer in writers.items()}
+
+async def store_row(name: str, request: Request, description: str):
+    try:
+        validated = store_bodies[name].validate(await request.body())
+        pending = writers[name].submit(validated)
+    except IngestionQueueFull as e:
+        return FastJSONResponse({"status": "busy", "message": str(e)}, status_code=503)
+    except Exception as e:
+        log_event(log, f"store-{name}", f"Error storing {description} data", level=logging.WARNING, error=str(e))
+        return FastJSONResponse({"status": "error", "message": str(e)})
+    return FastJSONResponse({"status": "queued", "pending": pending})
+
+def submit_training(kind: str, **params):
+    job = training_jobs.submit(kind, **params)
+    return JSONResponse(job, status_code=202)
+
+@app.get("/jobs")
+async def list_jobs():
+    return training_jobs.list()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
 
 @app.post("/train-arrival")
 def train_arrival():
-    metrics = train_arrival_models()
-    return metrics
+    return submit_training("arrival")
 
-@app.post("/predict-arrival")
-def predict_arrival_endpoint(data: ArrivalFeatures):
-    prob = predict_arrival_inference(data)
-    return {
+@app.post("/predict-arrival", openapi_extra=bodies["arrival"].openapi)
+async def predict_arrival_endpoint(request: Request):
+    data = await bodies["arrival"].parse(request)
+    prob = await batchers["arrival"].submit(data)
+    return FastJSONResponse({
         "confirm_probability": prob,
         "confirm": prob >= 0.4
-    }
+    })
+
+@app.post("/store-arrival", openapi_extra=store_bodies["arrival"].openapi)
+async def store_arrival(request: Request):
+    return await store_row("arrival", request, "arrival")
 
-@app.post("/store-arrival")
-def store_arrival(data: dict):
-    try:
-        validated = ArrivalFeatures(**data)
-        df = pd.DataFrame([validated.dict()])
-        df.to_csv("data/arrivals/arrivals.csv", mode="a", header=False, index=False)
-        return {"status": "stored"}
-    except Exception as e:
-        print(f"Error storing arrival data: {e}")
-        return {"status": "error", "message": str(e)}
 
+# training.train_eta.SEARCH_STRATEGIES; spelled out so the API process does not import the trainers
+EtaSearchStrategy = Literal["grid", "halving", "random"]
 
 @app.post("/train-eta")
-def train_eta():
-    metrics = train_eta_models()
-    return metrics
-
-@app.post("/predict-eta")
-def predict_eta_endpoint(data: ETAFeatures):
-    delay_seconds = predict_eta_inference(data)
-    base_travel_time = data.base_travel_time
+def train_eta(search: EtaSearchStrategy = "halving", n_iter: int = Query(20, ge=1)):
+    return submit_training("eta", search=search, n_iter=n_iter)
+
+def eta_response(data: ETAFeatures, delay_seconds, quantiles, base_travel_time=None):
+    if base_travel_time is None:
+        base_travel_time = data.base_travel_time
     eta_seconds = max(0, base_travel_time + delay_seconds)
-    
+    interval = None
+    if quantiles:
+        interval = [max(0.0, base_travel_time + quantiles["p10"]), max(0.0, base_travel_time + quantiles["p90"])]
+
     return {
         "delay_seconds": float(delay_seconds),
         "base_travel_time": float(base_travel_time),
         "eta_seconds": float(eta_seconds),
         "eta_minutes": round(eta_seconds / 60, 2),
-        "confidence": data.checkpoint_freshness_score
+        "confidence": data.checkpoint_freshness_score,
+        "delay_quantiles": quantiles,
+        "eta_interval_seconds": interval
     }
 
-@app.post("/store-eta")
-def store_eta(data: dict):
+@app.post("/predict-eta", openapi_extra=bodies["eta"].openapi)
+async def predict_eta_endpoint(request: Request):
+    data = await bodies["eta"].parse(request)
+    delay_seconds, quantiles = await batchers["eta"].submit(data)
+    return FastJSONResponse(eta_response(data, delay_seconds, quantiles))
+
+@app.post("/predict-eta/batch", openapi_extra=bodies["eta_batch"].openapi)
+async def predict_eta_batch_endpoint(request: Request):
+    data = await bodies["eta_batch"].parse(request)
+    if not data:
+        return FastJSONResponse([])
+
+    predictions = await inference_executor.run(predict_eta_batch_inference, data)
+    return FastJSONResponse([
+        eta_response(row, delay_seconds, quantiles) for row, (delay_seconds, quantiles) in zip(data, predictions)
+    ])
+
+@app.post("/predict-trip-eta", openapi_extra=bodies["trip_eta"].openapi)
+async def predict_trip_eta_endpoint(request: Request):
+    data = await bodies["trip_eta"].parse(request)
     try:
-        validated = ETAFeatures(**data)
-        df = pd.DataFrame([validated.dict()])
-        df.to_csv("data/eta/eta.csv", mode="a", header=False, index=False)
-        return {"status": "stored"}
-    except Exception as e:
-        print(f"Error storing ETA data: {e}")
-        return {"status": "error", "message": str(e)}
+        predictions, base_travel_times, template = await inference_executor.run(predict_trip_eta_inference, data)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return FastJSONResponse({
+        "bus_id": data.bus_id,
+        "trip_id": data.trip_id,
+        "prediction_made_at": data.prediction_made_at,
+        "stops": [
+            {"stop_id": stop_id, **eta_response(template, delay_seconds, quantiles, base_travel_time)}
+            for stop_id, (delay_seconds, quantiles), base_travel_time
+            in zip(data.stop_ids, predictions, base_travel_times)
+        ]
+    })
+
+@app.post("/store-eta", openapi_extra=store_bodies["eta"].openapi)
+async def store_eta(request: Request):
+    return await store_row("eta", request, "ETA")
 
 
 @app.post("/train-occupancy")
 def train_occupancy():
-    metrics = train_occupancy_models()
-    return metrics
+    return submit_training("occupancy")
 
-@app.post("/predict-occupancy")
-def predict_occupancy_endpoint(data: OccupancyFeatures):
-    result = predict_occupancy_inference(data)
-    return result
+@app.post("/predict-occupancy", openapi_extra=bodies["occupancy"].openapi)
+async def predict_occupancy_endpoint(request: Request):
+    data = await bodies["occupancy"].parse(request)
+    result = await inference_executor.run(predict_occupancy_inference, data)
+    return FastJSONResponse(result)
 
-@app.post("/store-occupancy")
-def store_occupancy(data: dict):
-    try:
-        validated = OccupancyFeatures(**data)
-        df = pd.DataFrame([validated.dict()])
-        import os
-        os.makedirs("data/occupancy", exist_ok=True)
-        df.to_csv("data/occupancy/occupancy.csv", mode="a", header=False, index=False)
-        return {"status": "stored"}
-    except Exception as e:
-        print(f"Error storing occupancy data: {e}")
-        return {"status": "error", "message": str(e)}
+@app.post("/store-occupancy", openapi_extra=store_bodies["occupancy"].openapi)
+async def store_occupancy(request: Request):
+    return await store_row("occupancy", request, "occupancy")
@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import functools
+import time
+from fastapi.routing import APIRoute
+from monitoring.metrics import STAGE_SECONDS, histogram
+
+REQUEST_SECONDS = histogram(
+    "ml_request_duration_seconds",
+    "Time from receiving a request to sending the response, by route",
+    ("endpoint", "method", "status"),
+)
+
+# [handler start, endpoint start, endpoint end] of the request being handled
+_marks = contextvars.ContextVar("route_marks", default=None)
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording every request's duration under its route template.
+
+    It sits outside the exception handlers, so responses they produce (503 when the
+    inference queue is full, 422 on validation errors) are counted with their real status.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the scope on the way in
+            endpoint = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(endpoint, scope["method"], status[0]).observe(time.perf_counter() - started)
+
+def mark_validated():
+    """End the validate stage here, for endpoints that validate the body themselves."""
+    marks = _marks.get()
+    if marks is not None:
+        marks[1] = time.perf_counter()
+
+def mark_serializing():
+    """Start the serialize stage here, for endpoints that render their own response."""
+    marks = _marks.get()
+    if marks is not None and marks[2] is None:
+        marks[2] = time.perf_counter()
+
+def _mark_endpoint(endpoint):
+    # sync endpoints run in a worker thread with a copy of the context; the marks list
+    # itself is shared, so the times written there are still seen by the handler
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def marked(*args, **kwargs):
+            marks = _marks.get()
+            if marks is not None:
+                marks[1] = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if marks is not None and marks[2] is None:
+                    marks[2] = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def marked(*args, **kwargs):
+            marks = _marks.get()
+            if marks is not None:
+                marks[1] = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                if marks is not None and marks[2] is None:
+                    marks[2] = time.perf_counter()
+    return marked
+
+class TimedRoute(APIRoute):
+    """APIRoute that records FastAPI's own work around the endpoint as stages.
+
+    validate is body parsing plus Pydantic validation, up to the endpoint call;
+    serialize is encoding and rendering the returned value into a response. Endpoints
+    that do either themselves move the boundary with mark_validated/mark_serializing.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
+        self._validate_seconds = STAGE_SECONDS.labels("validate", self.path)
+        self._serialize_seconds = STAGE_SECONDS.labels("serialize", self.path)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            marks = [time.perf_counter(), None, None]
+            token = _marks.set(marks)
+            try:
+                response = await handler(request)
+            finally:
+                _marks.reset(token)
+            if marks[1] is not None:
+                self._validate_seconds.observe(marks[1] - marks[0])
+            if marks[2] is not None:
+                self._serialize_seconds.observe(time.perf_counter() - marks[2])
+            return response
+
+        return timed_handler
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from monitoring.metrics import counter
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# records waiting for the writer thread; past this they are dropped, never waited on
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# share of per-request events kept for each endpoint, e.g. "predict-arrival=0.01,store-eta=1"
+DEFAULT_SAMPLE_RATES = {"predict-eta": 0.01, "predict-arrival": 0.01, "predict-occupancy": 0.01}
+
+dropped = counter("ml_log_records_dropped_total", "Log records dropped because the log queue was full")
+
+def parse_sample_rates(spec) -> dict:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, rate = item.partition("=")
+        rates[endpoint.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+sample_rates = {**DEFAULT_SAMPLE_RATES, **parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields."""
+
+    def format(self, record) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler over a bounded queue that drops a record instead of blocking when it is full."""
+
+    def prepare(self, record):
+        # formatting happens on the writer thread; the request thread only enqueues
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped.inc()
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # the stop marker must not be dropped like a record; at shutdown waiting is fine
+        self.queue.put(self._sentinel)
+
+_listener = None
+
+def get_logger(name) -> logging.Logger:
+    return logging.getLogger(f"ml.{name}")
+
+def setup_logging(stream=None, queue_size=LOG_QUEUE_SIZE, level=LOG_LEVEL):
+    """Send the service's "ml.*" loggers through a bounded queue to a JSON writer thread."""
+    global _listener
+    stop_logging()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    log_queue = queue.Queue(maxsize=queue_size)
+    _listener = _Listener(log_queue, handler)
+    _listener.start()
+
+    root = logging.getLogger("ml")
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+    root.propagate = False
+
+def stop_logging():
+    """Write out the records still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def log_event(logger, endpoint, message, level=logging.INFO, **fields):
+    """Log a per-request event, keeping only the endpoint's sample rate of them.
+
+    Sampled-out events return before a LogRecord is built, so a rate of 0.01 costs the
+    request one random() call 99 times in 100.
+    """
+    rate = sample_rates.get(endpoint, 1.0)
+    if rate < 1.0 and random.random() >= rate:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": {"endpoint": endpoint, "sample_rate": rate, **fields}})
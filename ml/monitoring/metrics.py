@@ -0,0 +1,179 @@
+import math
+import threading
+from bisect import bisect_left
+
+# seconds; fine at the low end where single-row stages live
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class _Child:
+    """One labelled series. Each thread adds into its own list of values, so recording
+    never contends on a lock; only a thread's first record registers its list, and a
+    scrape sums the lists of every thread that ever recorded."""
+
+    __slots__ = ("_local", "_shards", "_lock", "_size")
+
+    def __init__(self, size):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._size = size
+
+    def _values(self) -> list:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0] * self._size
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def totals(self) -> list:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self._size
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self._values()[0] += amount
+
+class HistogramChild(_Child):
+    # values are one count per bucket (the last one is +Inf) followed by the sum
+    __slots__ = ("bounds",)
+
+    def __init__(self, bounds):
+        super().__init__(len(bounds) + 2)
+        self.bounds = bounds
+
+    def observe(self, value):
+        values = self._values()
+        values[bisect_left(self.bounds, value)] += 1
+        values[-1] += value
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values; callers on a hot path should keep the result."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> list:
+        raise NotImplementedError
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def collect(self) -> list:
+        return [
+            ("", dict(zip(self.labelnames, key)), child.totals()[0])
+            for key, child in list(self._children.items())
+        ]
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def collect(self) -> list:
+        samples = []
+        for key, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, key))
+            *counts, total = child.totals()
+            samples.extend(histogram_samples(labels, self.buckets, counts, total))
+        return samples
+
+def histogram_samples(labels, bounds, counts, total) -> list:
+    """Prometheus histogram samples from per-bucket (non-cumulative) counts ending with +Inf."""
+    samples = []
+    cumulative = 0
+    for bound, count in zip([*bounds, "+Inf"], counts):
+        cumulative += count
+        samples.append(("_bucket", {**labels, "le": str(bound)}, cumulative))
+    samples.append(("_sum", labels, total))
+    samples.append(("_count", labels, cumulative))
+    return samples
+
+# name -> metric, rendered by /metrics
+registry = {}
+# callables returning [(name, type, help, samples)] for stats that are kept elsewhere
+collectors = []
+
+def _register(metric):
+    if not metric.labelnames:
+        # an unlabelled series is exported as 0 before its first record
+        metric.labels()
+    return registry.setdefault(metric.name, metric)
+
+def counter(name, help, labelnames=()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+def register_collector(collect):
+    collectors.append(collect)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format(value) -> str:
+    if isinstance(value, float) and not math.isfinite(value):
+        return "NaN" if math.isnan(value) else ("+Inf" if value > 0 else "-Inf")
+    return repr(value) if isinstance(value, float) else str(value)
+
+def render() -> str:
+    """Every registered metric and collector in the Prometheus text exposition format."""
+    families = [(m.name, m.type, m.help, m.collect()) for m in list(registry.values())]
+    for collect in collectors:
+        families.extend(collect())
+
+    lines = []
+    for name, type, help, samples in families:
+        lines.append(f"# HELP {name} {_escape(help)}")
+        lines.append(f"# TYPE {name} {type}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {_format(value)}" if label_text else f"{name}{suffix} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+STAGE_SECONDS = histogram(
+    "ml_stage_duration_seconds",
+    "Time spent in one stage of serving; name is the endpoint for validate/serialize, "
+    "the model for vectorize/predict and the dataset for flush",
+    ("stage", "name"),
+)
@@ -0,0 +1,44 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional
+
+class TripETARequest(BaseModel):
+    bus_id: int = Field(description="Bus identifier")
+    route_id: Optional[int] = Field(None, description="Route identifier")
+    trip_id: Optional[int] = Field(None, description="Trip identifier")
+    prediction_made_at: float = Field(description="Timestamp when prediction is being made (Unix ms)")
+    last_checkpoint_at: Optional[float] = Field(None, description="Arrival timestamp at the last confirmed stop (Unix ms)")
+    stop_ids: List[int] = Field(min_length=1, description="Downstream stops in travel order")
+    segment_times: List[float] = Field(min_length=1, description="Seconds to reach each stop from the previous one; the first segment starts at the last confirmed stop")
+    segment_distances_km: Optional[List[float]] = Field(None, description="Length of each segment (km), 0.5 km per stop when omitted")
+    scheduled_arrival_times: Optional[List[Optional[float]]] = Field(None, description="Scheduled arrival at each stop (Unix ms)")
+    features: Dict[str, float] = Field(default_factory=dict, description="ETAFeatures values shared by every stop (delay, history, weather, time of day, ...)")
+    stop_features: Dict[str, List[float]] = Field(default_factory=dict, description="ETAFeatures values that differ per stop, one entry per stop")
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        n = len(self.stop_ids)
+        per_stop = {
+            "segment_times": self.segment_times,
+            "segment_distances_km": self.segment_distances_km,
+            "scheduled_arrival_times": self.scheduled_arrival_times,
+            **{f"stop_features.{k}": v for k, v in self.stop_features.items()}
+        }
+        for name, values in per_stop.items():
+            if values is not None and len(values) != n:
+                raise ValueError(f"{name} has {len(values)} entries, expected one per stop ({n})")
+        if any(t < 0 for t in self.segment_times):
+            raise ValueError("segment_times must be non-negative")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "bus_id": 123,
+                "route_id": 7,
+                "prediction_made_at": 1704567890000,
+                "last_checkpoint_at": 1704567800000,
+                "stop_ids": [456, 457, 458],
+                "segment_times": [120, 95, 140],
+                "features": {"current_delay_seconds": 120, "hour_of_day": 8, "day_of_week": 2}
+            }
+        }
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
+
+from schemas.arrival_features import ArrivalFeatures
+from schemas.eta_features import ETAFeatures
+from schemas.occupancy_features import OccupancyFeatures
+from storage.parquet_dataset import TIME_FIELDS, arrow_schema, partition_month, write_partitioned
+from training.data_loader import CONVERTED_MARKER
+import pyarrow as pa
+
+DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data")
+
+DATASETS = {
+    "arrival": (ArrivalFeatures, "confirm_prob", "arrivals/arrivals.csv", "arrivals/dataset"),
+    "eta": (ETAFeatures, "delay_seconds", "eta/eta.csv", "eta/dataset"),
+    "occupancy": (OccupancyFeatures, "confirmed_occupancy_level", "occupancy/occupancy.csv", "occupancy/dataset"),
+}
+
+def convert(name, csv_path=None, root=None, chunksize=250_000):
+    schema, target, default_csv, default_root = DATASETS[name]
+    csv_path = csv_path or os.path.join(DATA_DIR, default_csv)
+    root = root or os.path.join(DATA_DIR, default_root)
+    table_schema = arrow_schema(schema, target)
+    time_field, seconds_per_unit = TIME_FIELDS[name]
+
+    print(f"Converting {csv_path} -> {root}")
+    total = 0
+    for chunk in pd.read_csv(csv_path, usecols=lambda c: c in table_schema.names, chunksize=chunksize):
+        for field in table_schema:
+            if field.name not in chunk.columns:
+                chunk[field.name] = None
+        # nullable ints survive the round trip instead of turning into floats
+        for field in table_schema:
+            if pa.types.is_integer(field.type):
+                chunk[field.name] = chunk[field.name].round().astype("Int64")
+        table = pa.Table.from_pandas(chunk[table_schema.names], schema=table_schema, preserve_index=False)
+        months = [partition_month(t, seconds_per_unit) for t in chunk[time_field].tolist()]
+        write_partitioned(table.append_column("month", pa.array(months, type=pa.string())), root)
+        total += len(chunk)
+        print(f"  rows {total:,}")
+    # training reads the CSV alongside the dataset until it is recorded here
+    with open(os.path.join(root, CONVERTED_MARKER), "a") as f:
+        f.write(os.path.realpath(csv_path) + "\n")
+    print(f"Done: {total:,} rows")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a collected CSV dataset to partitioned Parquet")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--csv", dest="csv_path")
+    parser.add_argument("--out", dest="root")
+    parser.add_argument("--chunksize", type=int, default=250_000)
+    args = parser.parse_args()
+    convert(args.dataset, args.csv_path, args.root, args.chunksize)
@@ -0,0 +1,123 @@
+import functools
+import os
+import typing
+import uuid
+from datetime import datetime, timezone
+import pyarrow as pa
+from ingestion.dataset_writer import DatasetWriter
+
+# month-sized date partitions keep files large enough to scan efficiently
+PARTITION_COLUMNS = ["month", "route_id"]
+
+@functools.cache
+def _ds():
+    # pyarrow.dataset drags in pandas; the API only needs it at the first flush
+    import pyarrow.dataset
+    return pyarrow.dataset
+
+@functools.cache
+def partitioning():
+    return _ds().partitioning(
+        pa.schema([("month", pa.string()), ("route_id", pa.int64())]),
+        flavor="hive"
+    )
+
+# dataset name -> (timestamp field used for the date partition, seconds per unit)
+TIME_FIELDS = {
+    "arrival": ("arrival_time", 1000),
+    "eta": ("prediction_made_at", 1000),
+    "occupancy": ("report_time", 1),
+}
+
+def _arrow_type(annotation):
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    base = args[0] if args else annotation
+    if base is int:
+        return pa.int64()
+    if base is bool:
+        return pa.bool_()
+    if base is str:
+        return pa.string()
+    return pa.float64()
+
+def arrow_schema(schema, target=None) -> pa.Schema:
+    """Typed Arrow schema for a feature model, plus the training target column."""
+    fields = [pa.field(name, _arrow_type(f.annotation)) for name, f in schema.model_fields.items()]
+    if target:
+        fields.append(pa.field(target, pa.float64()))
+    return pa.schema(fields)
+
+def partition_month(timestamp, seconds_per_unit) -> str:
+    if timestamp is None or timestamp != timestamp:
+        return None
+    return datetime.fromtimestamp(timestamp / seconds_per_unit, tz=timezone.utc).strftime("%Y-%m")
+
+def write_partitioned(table: pa.Table, root: str, batch_id: str = None):
+    """Append table under root as new files named part-<batch_id>-<i>.parquet."""
+    _ds().write_dataset(
+        # drop pandas metadata so reads come back as plain numpy dtypes
+        table.replace_schema_metadata(None),
+        root,
+        format="parquet",
+        partitioning=PARTITION_COLUMNS,
+        partitioning_flavor="hive",
+        basename_template=f"part-{batch_id or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore"
+    )
+
+def remove_batch(root: str, batch_id: str):
+    """Delete every file a write_partitioned call with this batch_id left under root."""
+    prefix = f"part-{batch_id}-"
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.startswith(prefix):
+                os.remove(os.path.join(dirpath, filename))
+
+def rows_to_table(rows, schema: pa.Schema, time_field, seconds_per_unit) -> pa.Table:
+    table = pa.Table.from_pylist(rows, schema=schema)
+    months = [partition_month(row.get(time_field), seconds_per_unit) for row in rows]
+    return table.append_column("month", pa.array(months, type=pa.string()))
+
+def read_dataset(root, columns=None, since=None, until=None, route_ids=None):
+    """Load a partitioned dataset into pandas, reading only the requested columns and partitions.
+
+    `since`/`until` are inclusive YYYY-MM (or YYYY-MM-DD) strings and select whole
+    month partitions.
+    """
+    ds = _ds()
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning())
+
+    expr = None
+    for clause in (
+        ds.field("month") >= since[:7] if since else None,
+        ds.field("month") <= until[:7] if until else None,
+        ds.field("route_id").isin(list(route_ids)) if route_ids else None,
+    ):
+        if clause is not None:
+            expr = clause if expr is None else expr & clause
+
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+class ParquetDatasetWriter(DatasetWriter):
+    """DatasetWriter that appends each batch as new Parquet files under root/month=.../route_id=.../"""
+
+    def __init__(self, name, root, schema, target=None, **kwargs):
+        self.arrow_schema = arrow_schema(schema, target)
+        self.time_field, self.seconds_per_unit = TIME_FIELDS[name]
+        kwargs.setdefault("max_batch", 5000)
+        kwargs.setdefault("flush_interval", 30.0)
+        super().__init__(name, root, schema, target=target, **kwargs)
+
+    def _append(self, rows):
+        os.makedirs(self.path, exist_ok=True)
+        table = rows_to_table(rows, self.arrow_schema, self.time_field, self.seconds_per_unit)
+        batch_id = uuid.uuid4().hex
+        try:
+            write_partitioned(table, self.path, batch_id)
+        except BaseException:
+            # a batch spanning several partitions may have been written in part; the retry
+            # writes it again in full
+            remove_batch(self.path, batch_id)
+            raise
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from benchmarks.bench_inference_stages import asgi_post
+from benchmarks.payloads import SCHEMAS, sample_payload
+from training.data_loader import load_training_frame
+import main
+
+# /store-* bodies exactly as src/services/ml-*/ build them, with the target each should store
+arrival = sample_payload(SCHEMAS["arrival"])
+eta = {**sample_payload(SCHEMAS["eta"]), "base_travel_time": 600.0}
+occupancy = sample_payload(SCHEMAS["occupancy"])
+CASES = [
+    # storeArrivalData(features, label)
+    ("arrival", {**arrival, "label": 0.87}, 0.87),
+    # storeOccupancyData(features, label)
+    ("occupancy", {**occupancy, "label": 3}, 3.0),
+    # logPredictionAccuracy -> storePredictionForTraining(trainingData): actual_eta_seconds ends up null
+    ("eta", {**eta, "delay_seconds": 95.0, "predicted_eta_seconds": 650.0, "error_seconds": 45.0,
+             "abs_error_seconds": 45.0, "actual_arrival_time": 1772586695000, "actual_eta_seconds": None}, 95.0),
+    # storePredictionForTraining(features, actualETA)
+    ("eta", {**eta, "actual_eta_seconds": 720.0}, 120.0),
+]
+
+async def post_all():
+    async with main.app.router.lifespan_context(main.app):
+        for name, payload, _ in CASES:
+            await asgi_post(main.app, f"/store-{name}", json.dumps(payload).encode())
+    # shutdown closes the writers, which flushes the queued rows
+
+def check():
+    failures = 0
+    for name, writer in main.writers.items():
+        expected = [target for n, _, target in CASES if n == name]
+        df = load_training_frame(writer.path, writer.schema, writer.target)
+        stored = sorted(df[writer.target].tolist()) if writer.target in df.columns else []
+        ok = stored == sorted(expected)
+        failures += not ok
+        print(f"{'OK ' if ok else 'FAIL'} /store-{name}: {writer.target} stored {stored}, expected {sorted(expected)}")
+    return failures
+
+if __name__ == "__main__":
+    # the writers use paths relative to the working directory; keep the rows out of ml/data
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        asyncio.run(post_all())
+        sys.exit(1 if check() else 0)
@@ -0,0 +1,93 @@
+import typing
+import numpy as np
+import pandas as pd
+
+# pydantic refuses floats this large when coercing to int
+_INT_LIMIT = float(2 ** 63)
+
+class ColumnRule:
+    """Constraints of one Pydantic field, as used by validate_frame."""
+
+    def __init__(self, name, field):
+        args = [a for a in typing.get_args(field.annotation) if a is not type(None)]
+        base = args[0] if args else field.annotation
+
+        self.name = name
+        self.is_int = base is int
+        self.required = field.is_required()
+        self.default = None if self.required else field.default
+        self.ge = self.gt = self.le = self.lt = None
+        for meta in field.metadata:
+            for bound in ("ge", "gt", "le", "lt"):
+                value = getattr(meta, bound, None)
+                if value is not None:
+                    setattr(self, bound, value)
+
+    def violations(self, values: np.ndarray) -> np.ndarray:
+        # NaN fails every comparison, which is also how pydantic treats it
+        bad = np.zeros(len(values), dtype=bool)
+        if self.is_int:
+            finite = np.isfinite(values)
+            bad |= ~finite
+            with np.errstate(invalid="ignore"):
+                bad |= finite & ((np.floor(values) != values) | (np.abs(values) >= _INT_LIMIT))
+        with np.errstate(invalid="ignore"):
+            if self.ge is not None:
+                bad |= ~(values >= self.ge)
+            if self.gt is not None:
+                bad |= ~(values > self.gt)
+            if self.le is not None:
+                bad |= ~(values <= self.le)
+            if self.lt is not None:
+                bad |= ~(values < self.lt)
+        return bad
+
+_RULES = {}
+
+def schema_rules(schema):
+    rules = _RULES.get(schema)
+    if rules is None:
+        rules = _RULES[schema] = [ColumnRule(name, f) for name, f in schema.model_fields.items()]
+    return rules
+
+def validate_frame(df: pd.DataFrame, schema):
+    """Check every schema column at once and drop rows that pydantic would reject.
+
+    Returns the accepted rows (schema columns only, in field order, with defaults
+    filled for absent optional columns and a fresh index) and a dict of
+    per-field violation counts.
+    """
+    n = len(df)
+    invalid = np.zeros(n, dtype=bool)
+    violations = {}
+    columns = {}
+
+    for rule in schema_rules(schema):
+        if rule.name not in df.columns:
+            if rule.required:
+                violations[rule.name] = n
+                invalid[:] = True
+            else:
+                default = np.nan if rule.default is None else rule.default
+                columns[rule.name] = np.full(n, default, dtype=np.float64)
+            continue
+
+        raw = df[rule.name]
+        values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        bad = rule.violations(values)
+        if raw.dtype == object:
+            # anything that was present but did not parse as a number
+            bad |= np.isnan(values) & raw.notna().to_numpy()
+
+        count = int(bad.sum())
+        if count:
+            violations[rule.name] = count
+            invalid |= bad
+        columns[rule.name] = values
+
+    keep = ~invalid
+    out = pd.DataFrame({name: values[keep] for name, values in columns.items()})
+    for rule in schema_rules(schema):
+        if rule.is_int and rule.name in out and not out[rule.name].isna().any():
+            out[rule.name] = out[rule.name].astype(np.int64)
+    return out, violations, keep
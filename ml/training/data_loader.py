@@ -0,0 +1,45 @@
+import os
+import pandas as pd
+from storage.parquet_dataset import read_dataset
+
+# written by storage/convert_csv.py: CSVs already copied into the dataset, one path per line
+CONVERTED_MARKER = "_converted_csv.txt"
+
+def data_sources(data_path):
+    """A single path or a list of paths, as a list."""
+    return [data_path] if isinstance(data_path, (str, os.PathLike)) else list(data_path)
+
+def converted_csvs(dataset_path):
+    try:
+        with open(os.path.join(dataset_path, CONVERTED_MARKER)) as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+def default_data_path(dataset_path, csv_path):
+    """The partitioned Parquet dataset collected by the service plus the CSV corpus.
+
+    The CSV is left out only once storage/convert_csv.py has copied it into the dataset.
+    """
+    sources = []
+    if os.path.isdir(dataset_path) and any(os.scandir(dataset_path)):
+        sources.append(dataset_path)
+        if os.path.realpath(csv_path) in converted_csvs(dataset_path):
+            return sources
+    if os.path.exists(csv_path) or not sources:
+        sources.append(csv_path)
+    return sources
+
+def load_training_frame(data_path, schema, target, since=None, until=None, route_ids=None):
+    columns = list(schema.model_fields) + [target]
+    frames = []
+    for path in data_sources(data_path):
+        if os.path.isdir(path):
+            frames.append(read_dataset(path, columns=columns, since=since, until=until, route_ids=route_ids))
+            continue
+        # CSVs carry no partitions; only the column projection and route filter apply
+        df = pd.read_csv(path, usecols=lambda c: c in columns)
+        if route_ids:
+            df = df[df["route_id"].isin(list(route_ids))]
+        frames.append(df)
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
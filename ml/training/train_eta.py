@@ -1,63 +1,131 @@
-import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score,  mean_absolute_percentage_error
-from sklearn.preprocessing import StandardScaler
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import train_test_split, GridSearchCV, HalvingGridSearchCV, RandomizedSearchCV
+from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score,  mean_absolute_percentage_error, mean_pinball_loss
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor, ExtraTreesRegressor
-from lightgbm import LGBMRegressor
+from lightgbm import LGBMRegressor, early_stopping
 from xgboost import XGBRegressor
-import joblib
 import os
 import sys
-from pydantic import ValidationError
+import time
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
 
 from schemas.eta_features import ETAFeatures
+from training.columnar_validation import validate_frame
+from inference.model_bundle import publish_bundle
+from training.data_loader import data_sources, default_data_path, load_training_frame
 
 DATA_PATH = os.path.join(SCRIPT_DIR, "..", "data", "eta", "eta.csv")
+DATASET_PATH = os.path.join(SCRIPT_DIR, "..", "data", "eta", "dataset")
 
-def train_eta_models(data_path=DATA_PATH):
-    print(f"\nLoading data from: {data_path}")
-    df = pd.read_csv(data_path)
+SEARCH_STRATEGIES = ("grid", "halving", "random")
+EARLY_STOPPING_ROUNDS = 20
+EARLY_STOPPING_MAX_ESTIMATORS = 1000
+# delay quantiles served next to the point estimate; p10..p90 is the reported ETA interval
+QUANTILES = {"p10": 0.1, "p50": 0.5, "p90": 0.9}
+
+def make_search(strategy, pipeline, params, n_iter=20, cv=5):
+    if strategy == "grid":
+        return GridSearchCV(pipeline, params, scoring="neg_mean_squared_error", cv=cv, n_jobs=-1, verbose=0)
+    if strategy == "halving":
+        return HalvingGridSearchCV(
+            pipeline, params, scoring="neg_mean_squared_error", cv=cv, factor=3,
+            random_state=42, n_jobs=-1, verbose=0
+        )
+    if strategy == "random":
+        return RandomizedSearchCV(
+            pipeline, params, n_iter=n_iter, scoring="neg_mean_squared_error", cv=cv,
+            random_state=42, n_jobs=-1, verbose=0
+        )
+    raise ValueError(f"Unknown search strategy '{strategy}', expected one of {SEARCH_STRATEGIES}")
+
+def apply_early_stopping(name, cfg, X_es, y_es):
+    """Cap n_estimators and let the booster stop on a held-out slice instead of searching the tree count.
+
+    Returns the search space and the fit params for the search.
+    """
+    params = {k: v for k, v in cfg["params"].items() if k != "reg__n_estimators"}
+    reg = cfg["pipeline"].named_steps["reg"]
+    reg.set_params(n_estimators=EARLY_STOPPING_MAX_ESTIMATORS)
+
+    if name == "lightgbm":
+        fit_params = {
+            "reg__eval_set": [(X_es, y_es)],
+            "reg__callbacks": [early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+        }
+    elif name == "xgboost":
+        reg.set_params(early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        fit_params = {"reg__eval_set": [(X_es, y_es)], "reg__verbose": False}
+    else:
+        # sklearn's GradientBoostingRegressor carves its own validation fraction
+        reg.set_params(n_iter_no_change=EARLY_STOPPING_ROUNDS, validation_fraction=0.1)
+        fit_params = {}
+    return params, fit_params
+
+def train_quantile_models(X_fit, y_fit, X_es, y_es, X_val, y_val):
+    """Fit one LightGBM quantile regressor per entry in QUANTILES, early-stopped on the held-out slice.
+
+    Returns the fitted pipelines and their validation metrics.
+    """
+    quantile_models, metrics = {}, {}
+    for q_name, alpha in QUANTILES.items():
+        pipeline = Pipeline([
+            ("reg", LGBMRegressor(
+                objective="quantile", alpha=alpha, n_estimators=EARLY_STOPPING_MAX_ESTIMATORS,
+                learning_rate=0.05, random_state=42, verbose=-1
+            ))
+        ])
+        pipeline.fit(
+            X_fit, y_fit,
+            reg__eval_set=[(X_es, y_es)],
+            reg__callbacks=[early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)]
+        )
+        preds = pipeline.predict(X_val)
+        quantile_models[q_name] = pipeline
+        metrics[q_name] = {
+            "pinball_loss": round(float(mean_pinball_loss(y_val, preds, alpha=alpha)), 2),
+            "below_rate": round(float(np.mean(y_val < preds)), 4),
+            "trees": int(pipeline.named_steps["reg"].best_iteration_ or EARLY_STOPPING_MAX_ESTIMATORS)
+        }
+
+    lo, hi = quantile_models["p10"].predict(X_val), quantile_models["p90"].predict(X_val)
+    metrics["interval_coverage"] = round(float(np.mean((y_val >= lo) & (y_val <= hi))), 4)
+    return quantile_models, metrics
+
+def train_eta_models(data_path=None, since=None, until=None, route_ids=None, search="halving", n_iter=20, cv=5, progress=None):
+    if search not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{search}', expected one of {SEARCH_STRATEGIES}")
+
+    data_path = data_path or default_data_path(DATASET_PATH, DATA_PATH)
+    print(f"\nLoading data from: {', '.join(data_sources(data_path))}")
+    df = load_training_frame(data_path, ETAFeatures, "delay_seconds", since=since, until=until, route_ids=route_ids)
     df = df.fillna(0.0)
     
-    print("\nValidating features with Pydantic schema...")
-    validated_data = []
-    validation_errors = 0
-    target_values = []
-    
+    print("\nValidating features against the Pydantic schema constraints...")
     TARGET_COLUMN = "delay_seconds"
-    
-    for idx, row in df.iterrows():
-        try:
-            row_dict = row.to_dict()
-            if TARGET_COLUMN in row_dict:
-                target_values.append(row_dict[TARGET_COLUMN])
-            else:
-                raise ValueError(f"Row {idx}: Missing target column '{TARGET_COLUMN}'")
-            
-            eta_features = ETAFeatures(**row_dict)
-            valid_row = eta_features.model_dump()
-            valid_row[TARGET_COLUMN] = row_dict[TARGET_COLUMN]
-            validated_data.append(valid_row)
-        except ValidationError as e:
-            validation_errors += 1
-            if validation_errors <= 5:
-                print(f"Row {idx}: {e}")
-    
+
+    if TARGET_COLUMN not in df.columns:
+        raise ValueError(f"Missing target column '{TARGET_COLUMN}'")
+
+    validated, violations, keep = validate_frame(df, ETAFeatures)
+    validated[TARGET_COLUMN] = df[TARGET_COLUMN].to_numpy()[keep]
+    validation_errors = len(df) - len(validated)
+
     if validation_errors > 0:
         print(f"\nTotal validation errors: {validation_errors}/{len(df)}")
-        print(f"Valid rows: {len(validated_data)}")
+        for field, count in sorted(violations.items(), key=lambda kv: -kv[1])[:5]:
+            print(f"  {field}: {count} rows out of bounds or invalid")
+        print(f"Valid rows: {len(validated)}")
     else:
-        print(f"All {len(validated_data)} rows validated successfully")
+        print(f"All {len(validated)} rows validated successfully")
     
-    if len(validated_data) == 0:
+    if len(validated) == 0:
         raise ValueError("No valid data after validation!")
     
-    df = pd.DataFrame(validated_data)
+    df = validated
     
     if "actual_eta_seconds" in df.columns and "base_travel_time" in df.columns:
         df["delay_seconds"] = df["actual_eta_seconds"] - df["base_travel_time"]
@@ -86,6 +154,7 @@ def train_eta_models(data_path=DATA_PATH):
             "pipeline": Pipeline([
                 ("reg", LGBMRegressor(random_state=42, verbose=-1))
             ]),
+            "early_stopping": True,
             "params": {
                 "reg__n_estimators": [100, 200, 300],
                 "reg__learning_rate": [0.01, 0.05, 0.1],
@@ -98,6 +167,7 @@ def train_eta_models(data_path=DATA_PATH):
             "pipeline": Pipeline([
                 ("reg", XGBRegressor(random_state=42, eval_metric='rmse'))
             ]),
+            "early_stopping": True,
             "params": {
                 "reg__n_estimators": [100, 200, 300],
                 "reg__learning_rate": [0.01, 0.05, 0.1],
@@ -122,6 +192,7 @@ def train_eta_models(data_path=DATA_PATH):
             "pipeline": Pipeline([
                 ("reg", GradientBoostingRegressor(random_state=42))
             ]),
+            "early_stopping": True,
             "params": {
                 "reg__n_estimators": [100, 200, 300],
                 "reg__learning_rate": [0.05, 0.1, 0.15],
@@ -148,24 +219,36 @@ def train_eta_models(data_path=DATA_PATH):
     best_name = None
     results = []
     
+    # the grid strategy keeps the exhaustive search over n_estimators; the others early-stop on this slice
+    X_fit, X_es, y_fit, y_es = train_test_split(X_train, y_train, test_size=0.1, random_state=42)
+    
     print("\n" + "=" * 60)
-    print("TRAINING MODELS")
+    print(f"TRAINING MODELS (search: {search})")
     print("=" * 60)
     
-    for name, cfg in models.items():
+    training_started = time.perf_counter()
+    
+    for i, (name, cfg) in enumerate(models.items()):
+        if progress:
+            progress({"stage": "training", "model": name, "progress": i / len(models)})
+        params, fit_params = cfg["params"], {}
+        X_search, y_search = X_train, y_train
+        if search != "grid" and cfg.get("early_stopping"):
+            params, fit_params = apply_early_stopping(name, cfg, X_es, y_es)
+            if fit_params:
+                X_search, y_search = X_fit, y_fit
+        
         print(f"\nTraining: {name.upper()}")
-        print(f"  Hyperparameter combinations: {np.prod([len(v) for v in cfg['params'].values()])}")
+        print(f"  Search space: {np.prod([len(v) for v in params.values()])} combinations")
         
-        grid = GridSearchCV(
-            cfg["pipeline"],
-            cfg["params"],
-            scoring="neg_mean_squared_error",
-            cv=5,
-            n_jobs=-1,
-            verbose=0
-        )
+        grid = make_search(search, cfg["pipeline"], params, n_iter=n_iter, cv=cv)
         
-        grid.fit(X_train, y_train)
+        started = time.perf_counter()
+        grid.fit(X_search, y_search, **fit_params)
+        fit_seconds = time.perf_counter() - started
+        # random search samples n_iter of the space; halving refits the survivors of each round
+        print(f"  Candidates fitted: {len(grid.cv_results_['params'])}")
+        cv_rmse = float(np.sqrt(-grid.best_score_))
         preds = grid.predict(X_val)
         
         mse = mean_squared_error(y_val, preds)
@@ -182,6 +265,8 @@ def train_eta_models(data_path=DATA_PATH):
         print(f"    MAE:  {mae:.2f}s ({mae_minutes:.2f} min)")
         print(f"    MAPE: {mape:.2f}%")
         print(f"    R²:   {r2:.4f}")
+        print(f"    CV RMSE: {cv_rmse:.2f}s")
+        print(f"    Wall time: {fit_seconds:.1f}s")
         print(f"    Best params: {grid.best_params_}")
         
         results.append({
@@ -192,21 +277,46 @@ def train_eta_models(data_path=DATA_PATH):
             "mae_minutes": mae_minutes,
             "mape": mape,
             "r2": r2,
+            "cv_rmse": cv_rmse,
+            "fit_seconds": fit_seconds,
             "best_params": grid.best_params_
         })
         
+        if progress:
+            progress({
+                "stage": "model_done",
+                "model": name,
+                "progress": (i + 1) / len(models),
+                "metrics": {
+                    "rmse": float(rmse),
+                    "mae": float(mae),
+                    "r2": float(r2),
+                    "cv_rmse": cv_rmse,
+                    "fit_seconds": fit_seconds
+                }
+            })
+        
         if rmse < best_score:
             best_score = rmse
             best_model = grid.best_estimator_
             best_name = name
     
-    model_dir = os.path.join(SCRIPT_DIR, "..", "models")
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "best_model_eta.pkl")
-    feature_order_path = os.path.join(model_dir, "eta_feature_order.pkl")
+    if progress:
+        progress({"stage": "quantiles", "model": "lightgbm_quantile", "progress": 1.0})
+    print("\nTraining quantile models (LightGBM, quantile objective)...")
+    quantile_models, quantile_metrics = train_quantile_models(X_fit, y_fit, X_es, y_es, X_val, y_val)
+    for q_name in QUANTILES:
+        m = quantile_metrics[q_name]
+        print(f"  {q_name}: pinball loss {m['pinball_loss']:.2f}s, below rate {m['below_rate']:.3f}, {m['trees']} trees")
+    print(f"  p10-p90 coverage: {quantile_metrics['interval_coverage']:.3f}")
     
-    joblib.dump(best_model, model_path)
-    joblib.dump(FEATURE_COLUMNS, feature_order_path)
+    total_seconds = time.perf_counter() - training_started
+    
+    model_path = publish_bundle(
+        "eta", best_model, FEATURE_COLUMNS,
+        metadata={"model": best_name, "rmse": float(best_score), "search": search, "quantile_metrics": quantile_metrics},
+        quantile_models=quantile_models
+    )
     
     print("\n" + "=" * 60)
     print("TRAINING COMPLETE")
@@ -223,16 +333,17 @@ def train_eta_models(data_path=DATA_PATH):
     
     print(f"\nSaved:")
     print(f"  Model: {model_path}")
-    print(f"  Features: {feature_order_path}")
     
     print("\nMODEL COMPARISON:")
     print("-" * 90)
-    print(f"{'Model':<18} {'RMSE (min)':<12} {'MAE (min)':<12} {'MAPE (%)':<10} {'R²':<8}")
+    print(f"{'Model':<18} {'RMSE (min)':<12} {'MAE (min)':<12} {'MAPE (%)':<10} {'R²':<8} {'Time (s)':<8}")
     print("-" * 90)
     for result in sorted(results, key=lambda x: x['rmse']):
         print(f"{result['model']:<18} {result['rmse_minutes']:>10.2f}  "
-              f"{result['mae_minutes']:>10.2f}  {result['mape']:>8.2f}  {result['r2']:>6.4f}")
+              f"{result['mae_minutes']:>10.2f}  {result['mape']:>8.2f}  {result['r2']:>6.4f}  "
+              f"{result['fit_seconds']:>8.1f}")
     print("-" * 90)
+    print(f"Total search time: {total_seconds:.1f}s")
     
     return {
         "model": best_name,
@@ -245,12 +356,31 @@ def train_eta_models(data_path=DATA_PATH):
         "model_path": str(model_path),
         "feature_count": len(FEATURE_COLUMNS),
         "training_samples": len(X_train),
-        "validation_samples": len(X_val)
+        "validation_samples": len(X_val),
+        "search": search,
+        "search_seconds": round(total_seconds, 1),
+        "quantiles": quantile_metrics,
+        "families": [
+            {
+                "model": r["model"],
+                "rmse": round(r["rmse"], 2),
+                "cv_rmse": round(r["cv_rmse"], 2),
+                "fit_seconds": round(r["fit_seconds"], 1),
+                "best_params": r["best_params"]
+            }
+            for r in results
+        ]
     }
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Train ETA delay models")
+    parser.add_argument("--search", choices=SEARCH_STRATEGIES, default="halving")
+    parser.add_argument("--n-iter", type=int, default=20, help="candidates per family for --search random")
+    parser.add_argument("--data", dest="data_path")
+    args = parser.parse_args()
     try:
-        results = train_eta_models()
+        results = train_eta_models(data_path=args.data_path, search=args.search, n_iter=args.n_iter)
         print("\nTraining completed successfully!")
     except Exception as e:
         print(f"\nError during training: {e}")
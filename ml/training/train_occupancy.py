@@ -1,58 +1,50 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.linear_model import LinearRegression, Ridge, Lasso
+from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.svm import SVR
-import joblib
 import os
 import sys
-from pydantic import ValidationError
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(SCRIPT_DIR, '..'))
 
 from schemas.occupancy_features import OccupancyFeatures
+from training.columnar_validation import validate_frame
+from inference.model_bundle import publish_bundle
+from training.data_loader import data_sources, default_data_path, load_training_frame
 
 DATA_PATH = os.path.join(SCRIPT_DIR, "..", "data", "occupancy", "occupancy.csv")
+DATASET_PATH = os.path.join(SCRIPT_DIR, "..", "data", "occupancy", "dataset")
 
-def train_occupancy_models(data_path=DATA_PATH):
-    print(f"\nLoading occupancy data from: {data_path}")
-    df = pd.read_csv(data_path)
+def train_occupancy_models(data_path=None, since=None, until=None, route_ids=None, progress=None):
+    data_path = data_path or default_data_path(DATASET_PATH, DATA_PATH)
+    print(f"\nLoading occupancy data from: {', '.join(data_sources(data_path))}")
+    df = load_training_frame(data_path, OccupancyFeatures, "confirmed_occupancy_level", since=since, until=until, route_ids=route_ids)
     df = df.fillna(0.0)
 
-    print("\nValidating features with Pydantic schema...")
-    validated_data = []
-    validation_errors = 0
-
+    print("\nValidating features against the Pydantic schema constraints...")
     TARGET_COLUMN = "confirmed_occupancy_level"
 
-    for idx, row in df.iterrows():
-        try:
-            row_dict = row.to_dict()
-            if TARGET_COLUMN not in row_dict:
-                raise ValueError(f"Row {idx}: Missing target column '{TARGET_COLUMN}'")
-
-            occupancy_features = OccupancyFeatures(**row_dict)
-            valid_row = occupancy_features.model_dump()
-            valid_row[TARGET_COLUMN] = row_dict[TARGET_COLUMN]
-            validated_data.append(valid_row)
+    if TARGET_COLUMN not in df.columns:
+        raise ValueError(f"Missing target column '{TARGET_COLUMN}'")
 
-        except ValidationError as e:
-            validation_errors += 1
-            if validation_errors <= 5:
-                print(f"Validation error for row {idx}: {e}")
+    validated, violations, keep = validate_frame(df, OccupancyFeatures)
+    validated[TARGET_COLUMN] = df[TARGET_COLUMN].to_numpy()[keep]
+    validation_errors = len(df) - len(validated)
 
     if validation_errors > 0:
         print(f"\nTotal validation errors: {validation_errors}/{len(df)}")
-        print(f"Valid rows: {len(validated_data)}")
+        for field, count in sorted(violations.items(), key=lambda kv: -kv[1])[:5]:
+            print(f"  {field}: {count} rows out of bounds or invalid")
+        print(f"Valid rows: {len(validated)}")
     else:
-        print(f"All {len(validated_data)} rows validated successfully")
-
-    df = pd.DataFrame(validated_data)
+        print(f"All {len(validated)} rows validated successfully")
+    
+    df = validated
 
     FEATURE_COLUMNS = [
         field for field in OccupancyFeatures.model_fields
@@ -121,7 +113,9 @@ def train_occupancy_models(data_path=DATA_PATH):
     best_score = 0
     best_name = None
 
-    for name, cfg in models.items():
+    for i, (name, cfg) in enumerate(models.items()):
+        if progress:
+            progress({"stage": "training", "model": name, "progress": i / len(models)})
         print(f"\nTraining occupancy model: {name}")
 
         grid = GridSearchCV(
@@ -145,18 +139,20 @@ def train_occupancy_models(data_path=DATA_PATH):
         print(f"  MAE: {mae:.4f}")
         print(f"  R²: {r2:.4f}")
 
+        if progress:
+            progress({
+                "stage": "model_done",
+                "model": name,
+                "progress": (i + 1) / len(models),
+                "metrics": {"rmse": float(rmse), "mae": float(mae), "r2": float(r2)}
+            })
+
         if rmse < best_score or best_score == 0:
             best_score = rmse
             best_model = grid.best_estimator_
             best_name = name
 
-    model_dir = os.path.join(SCRIPT_DIR, "..", "models")
-    os.makedirs(model_dir, exist_ok=True)
-    model_path = os.path.join(model_dir, "best_model_occupancy.pkl")
-    feature_order_path = os.path.join(model_dir, "occupancy_feature_order.pkl")
-
-    joblib.dump(best_model, model_path)
-    joblib.dump(FEATURE_COLUMNS, feature_order_path)
+    model_path = publish_bundle("occupancy", best_model, FEATURE_COLUMNS, metadata={"model": best_name, "rmse": float(best_score)})
 
     print("\nBEST OCCUPANCY MODEL")
     print(f"Model: {best_name}")
@@ -1,14 +1,15 @@
 import { trainArrivalModelIntergrate } from "../services/ml-arrival-confirmation/mlArrivalIntegration.service.js";
 import { trainETAModelIntegrate } from "../services/ml-eta-prediction/mlEtaIntegration.service.js";
+import { getTrainingJob } from "../services/ml-eta-prediction/index.js";
 import { trainOccupancyModelIntegrate } from "../services/ml-occupancy-prediction/mlOccupancyIntegration.service.js";
 
 export const trainArrivalModelController = async (req, res) => {
     try {
         const result = await trainArrivalModelIntergrate();
-        return res.status(200).json({
+        return res.status(202).json({
             success: true,
-            message: "Model trained successfully",
-            metrics: result
+            message: "Arrival model training job submitted",
+            job: result
         });
     } catch (error) {
         console.error("Error in trainArrivalModelController:", error.message);
@@ -25,10 +26,10 @@ export const trainArrivalModelController = async (req, res) => {
 export const trainOccupancyModelController = async (req, res) => {
     try {
         const result = await trainOccupancyModelIntegrate();
-        return res.status(200).json({
+        return res.status(202).json({
             success: true,
-            message: "Occupancy model trained successfully",
-            metrics: result
+            message: "Occupancy model training job submitted",
+            job: result
         });
     } catch (error) {
         console.error("Error in trainOccupancyModelController:", error.message);
@@ -45,10 +46,10 @@ export const trainOccupancyModelController = async (req, res) => {
 export const trainETAModelController = async (req, res) => {
     try {
         const result = await trainETAModelIntegrate();
-        return res.status(200).json({
+        return res.status(202).json({
             success: true,
-            message: "ETA model trained successfully",
-            metrics: result
+            message: "ETA model training job submitted",
+            job: result
         });
     } catch (error) {
         console.error("Error in trainETAModelController:", error.message);
@@ -60,4 +61,23 @@ export const trainETAModelController = async (req, res) => {
             message: error.message
         });
     }
-}
\ No newline at end of file
+}
+
+export const getTrainingJobController = async (req, res) => {
+    try {
+        const job = await getTrainingJob(req.params.jobId);
+        return res.status(200).json({
+            success: true,
+            job
+        });
+    } catch (error) {
+        console.error("Error in getTrainingJobController:", error.message);
+
+        const statusCode = error.message.includes("404") ? 404 : 500;
+
+        return res.status(statusCode).json({
+            success: false,
+            message: error.message
+        });
+    }
+}
@@ -1,10 +1,11 @@
 import express from "express";
-import { trainArrivalModelController, trainOccupancyModelController, trainETAModelController } from "../controllers/mlIntegration.controller.js";
+import { trainArrivalModelController, trainOccupancyModelController, trainETAModelController, getTrainingJobController } from "../controllers/mlIntegration.controller.js";
 
 const router = express.Router();
 
 router.post("/train-arrival-model", trainArrivalModelController);
 router.post("/train-occupancy-model", trainOccupancyModelController);
 router.post("/train-eta-model", trainETAModelController);
+router.get("/training-jobs/:jobId", getTrainingJobController);
 
 export default router;
\ No newline at end of file
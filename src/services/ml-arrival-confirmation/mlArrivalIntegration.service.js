@@ -34,7 +34,7 @@ export const trainArrivalModelIntergrate = async () => {
     }
 
     const result = await trainArrivalModel();
-    console.log("Model training completed:", result);
+    console.log("Training job submitted:", result.id);
 
     return result;
 }
@@ -16,6 +16,32 @@ export const predictETA = async (features) => {
 };
 
 
+export const predictETABatch = async (featuresList) => {
+    try {
+        const response = await axios.post(`${ML_SERVICE_URL}/predict-eta/batch`, featuresList, {
+            timeout: 5000
+        });
+        return response.data;
+    } catch (error) {
+        console.error("Error predicting ETA batch:", error.message);
+        throw new Error(`Failed to predict ETA batch: ${error.message}`);
+    }
+};
+
+
+export const predictTripETA = async (tripState) => {
+    try {
+        const response = await axios.post(`${ML_SERVICE_URL}/predict-trip-eta`, tripState, {
+            timeout: 5000
+        });
+        return response.data;
+    } catch (error) {
+        console.error("Error predicting trip ETA:", error.message);
+        throw new Error(`Failed to predict trip ETA: ${error.message}`);
+    }
+};
+
+
 export const trainETAModel = async () => {
     try {
         const response = await axios.post(`${ML_SERVICE_URL}/train-eta`);
@@ -27,6 +53,19 @@ export const trainETAModel = async () => {
 };
 
 
+export const getTrainingJob = async (jobId) => {
+    try {
+        const response = await axios.get(`${ML_SERVICE_URL}/jobs/${jobId}`, {
+            timeout: 3000
+        });
+        return response.data;
+    } catch (error) {
+        console.error("Error fetching training job:", error.message);
+        throw new Error(`Failed to fetch training job: ${error.message}`);
+    }
+};
+
+
 export const storeETAData = async (data) => {
     try {
         const response = await axios.post(`${ML_SERVICE_URL}/store-eta`, data, {
@@ -42,7 +81,7 @@ export const storeETAData = async (data) => {
 
 export const checkMLServiceHealth = async () => {
     try {
-        await axios.get(`${ML_SERVICE_URL}/docs`, { timeout: 5000 });
+        await axios.get(`${ML_SERVICE_URL}/healthz`, { timeout: 5000 });
         return true;
     } catch (error) {
         console.warn("ML service is not available:", error.message);
@@ -82,7 +82,7 @@ export const trainETAModelIntegrate = async () => {
     }
 
     const result = await trainETAModel();
-    console.log("ETA model training completed:", result);
+    console.log("ETA training job submitted:", result.id);
 
     return result;
 };
@@ -39,7 +39,7 @@ export const storeOccupancyData = async (features, label) => {
 
 export const checkMLServiceHealth = async () => {
     try {
-        await axios.get(`${ML_SERVICE_URL}/docs`, { timeout: 5000 });
+        await axios.get(`${ML_SERVICE_URL}/healthz`, { timeout: 5000 });
         return true;
     } catch (error) {
         console.warn("ML service is not available:", error.message);
@@ -54,7 +54,7 @@ export const trainOccupancyModelIntegrate = async () => {
     }
 
     const result = await trainOccupancyModel();
-    console.log("Occupancy model training completed:", result);
+    console.log("Occupancy training job submitted:", result.id);
     return result;
 };
 